@@ -1,37 +1,139 @@
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
+import atexit
+import hmac
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from waitress import serve
-import json
+import orjson
+import msgspec
+from typing import Annotated
 from bson import ObjectId
+from config import get_settings
 
-# Custom JSON encoder to handle MongoDB ObjectId
-class JSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        return super(JSONEncoder, self).default(obj)
+def _orjson_default(obj):
+    # Only reached for types orjson can't serialize natively, e.g. MongoDB ObjectId
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError
+
+# JSON provider backed by orjson for faster request/response (de)serialization
+class OrjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# Request body for register/login, decoded and validated in one C-level pass
+class Credentials(msgspec.Struct):
+    username: Annotated[str, msgspec.Meta(min_length=1)]
+    password: Annotated[str, msgspec.Meta(min_length=1)]
+
+def _decode_credentials():
+    try:
+        return msgspec.json.decode(request.get_data(cache=False), type=Credentials)
+    except msgspec.DecodeError:
+        return None
 
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
-app.json_encoder = JSONEncoder
+app.json = OrjsonProvider(app)
 
 # Load configuration
-app.config.from_pyfile('config.py')
+app.config.update(get_settings().to_flask_config())
+
+# Rate limiting - login runs an expensive KDF, so cap attempts per client+username.
+# Set RATELIMIT_STORAGE_URI to a shared backend (e.g. redis://) for multi-process deploys.
+def _login_rate_key():
+    user_data = request.get_json(silent=True)
+    # A JSON list/string body must not 500 the limiter before the view can reject it
+    username = user_data.get('username', '') if isinstance(user_data, dict) else ''
+    return f"{get_remote_address()}|{username}"
+
+limiter = Limiter(get_remote_address, app=app)
+
+@app.errorhandler(429)
+def rate_limit_exceeded(e):
+    return jsonify({"error": "Too many requests, please try again later"}), 429
+
+# MongoDB connection - one pooled, thread-safe client shared by all requests
+_client = MongoClient(
+    host=app.config['MONGO_HOST'],
+    port=app.config['MONGO_PORT'],
+    username=app.config['MONGO_USERNAME'],
+    password=app.config['MONGO_PASSWORD'],
+    maxPoolSize=50,
+    minPoolSize=5,
+    serverSelectionTimeoutMS=3000
+)
+atexit.register(_client.close)
 
-# MongoDB connection
 def get_db():
-    client = MongoClient(
-        host=app.config['MONGO_HOST'],
-        port=app.config['MONGO_PORT'],
-        username=app.config['MONGO_USERNAME'],
-        password=app.config['MONGO_PASSWORD']
-    )
-    db = client[app.config['MONGO_DB']]
-    return db
+    return _client[app.config['MONGO_DB']]
+
+def ensure_indexes():
+    """Create the unique username index used for lookups and duplicate checks"""
+    try:
+        get_db().users.create_index("username", unique=True, background=True)
+    except PyMongoError as e:
+        print(f"Warning: could not create users.username index: {e}")
+
+ensure_indexes()
+
+# Hash checked when a username does not exist, so unknown-user and
+# wrong-password responses take the same time
+DUMMY_HASH = generate_password_hash(
+    "x",
+    method=app.config['PASSWORD_HASH_METHOD'],
+    salt_length=app.config['PASSWORD_SALT_LENGTH']
+)
+
+# Short-lived cache of successful password checks so repeat logins skip the KDF.
+# Keys are HMACs under a per-process pepper; only positive results are stored.
+PASSWORD_CACHE_TTL = 60
+PASSWORD_CACHE_SIZE = 10000
+_PEPPER = secrets.token_bytes(32)
+_password_cache = OrderedDict()
+_password_cache_lock = threading.Lock()
+
+def _password_cache_key(username, password, stored_hash):
+    digest = hashlib.blake2b(password.encode(), digest_size=16).digest()
+    message = username.encode() + b"|" + digest + b"|" + stored_hash.encode()
+    return hmac.new(_PEPPER, message, 'sha256').digest()
+
+def verify_password(user, password):
+    """Check a password against a user document, caching successful checks"""
+    key = _password_cache_key(user['username'], password, user['password'])
+    now = time.monotonic()
+    
+    with _password_cache_lock:
+        expires = _password_cache.get(key)
+        if expires is not None:
+            if expires > now:
+                return True
+            del _password_cache[key]
+    
+    if not check_password_hash(user['password'], password):
+        return False
+    
+    with _password_cache_lock:
+        _password_cache[key] = now + PASSWORD_CACHE_TTL
+        _password_cache.move_to_end(key)
+        if len(_password_cache) > PASSWORD_CACHE_SIZE:
+            _password_cache.popitem(last=False)
+    return True
 
 # API Routes
 @app.route('/api/register', methods=['POST'])
@@ -39,49 +141,54 @@ def register():
     db = get_db()
     users = db.users
     
-    # Get user data from request
-    user_data = request.get_json()
-    username = user_data.get('username')
-    password = user_data.get('password')
-    
-    # Validate input
-    if not username or not password:
+    # Get and validate user data from request
+    creds = _decode_credentials()
+    if creds is None:
         return jsonify({"error": "Username and password are required"}), 400
-    
-    # Check if username already exists
-    if users.find_one({"username": username}):
-        return jsonify({"error": "Username already exists"}), 400
+    username = creds.username
+    password = creds.password
     
     # Hash password
-    hashed_password = generate_password_hash(password)
+    hashed_password = generate_password_hash(
+        password,
+        method=app.config['PASSWORD_HASH_METHOD'],
+        salt_length=app.config['PASSWORD_SALT_LENGTH']
+    )
     
-    # Insert user into database
-    user_id = users.insert_one({
-        "username": username,
-        "password": hashed_password
-    }).inserted_id
+    # Insert user into database (unique index rejects existing usernames)
+    try:
+        user_id = users.insert_one({
+            "username": username,
+            "password": hashed_password
+        }).inserted_id
+    except DuplicateKeyError:
+        return jsonify({"error": "Username already exists"}), 400
     
     return jsonify({"message": "User registered successfully", "user_id": str(user_id)}), 201
 
 @app.route('/api/login', methods=['POST'])
+@limiter.limit(lambda: app.config['LOGIN_RATE_LIMIT'], key_func=_login_rate_key)
 def login():
     db = get_db()
     users = db.users
     
-    # Get user data from request
-    user_data = request.get_json()
-    username = user_data.get('username')
-    password = user_data.get('password')
-    
-    # Validate input
-    if not username or not password:
+    # Get and validate user data from request
+    creds = _decode_credentials()
+    if creds is None:
         return jsonify({"error": "Username and password are required"}), 400
+    username = creds.username
+    password = creds.password
     
-    # Find user in database
-    user = users.find_one({"username": username})
+    # Find user in database (indexed lookup)
+    user = users.find_one(
+        {"username": username},
+        projection={"_id": 1, "username": 1, "password": 1}
+    )
     
     # Check if user exists and password is correct
-    if user and check_password_hash(user['password'], password):
+    if user is None:
+        check_password_hash(DUMMY_HASH, password)
+    elif verify_password(user, password):
         return jsonify({
             "message": "Login successful",
             "user_id": str(user['_id']),
@@ -96,4 +203,14 @@ def health_check():
 
 if __name__ == '__main__':
     print(f"Starting server on port {app.config['PORT']}")
-    serve(app, host='0.0.0.0', port=app.config['PORT'])
+    serve(
+        app,
+        host='0.0.0.0',
+        port=app.config['PORT'],
+        threads=app.config['WAITRESS_THREADS'],
+        backlog=app.config['WAITRESS_BACKLOG'],
+        connection_limit=app.config['WAITRESS_CONNECTION_LIMIT'],
+        channel_timeout=30,
+        cleanup_interval=10,
+        asyncore_use_poll=True
+    )
@@ -1,4 +1,6 @@
 import os
+import functools
+from dataclasses import dataclass, fields
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -7,14 +9,59 @@ env_path = Path(__file__).parent / '.env'
 if env_path.exists():
     load_dotenv(dotenv_path=env_path)
 
-# MongoDB Configuration
-MONGO_HOST = os.environ.get('MONGO_HOST', 'localhost')
-MONGO_PORT = int(os.environ.get('MONGO_PORT', 27017))
-MONGO_USERNAME = os.environ.get('MONGO_USERNAME', '')
-MONGO_PASSWORD = os.environ.get('MONGO_PASSWORD', '')
-MONGO_DB = os.environ.get('MONGO_DB', 'longrun')
-
-# Application Configuration
-PORT = int(os.environ.get('PORT', 8888))
-DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
-SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
+def _env_bool(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed application settings, parsed once from the environment"""
+    # MongoDB Configuration
+    mongo_host: str = 'localhost'
+    mongo_port: int = 27017
+    mongo_username: str = ''
+    mongo_password: str = ''
+    mongo_db: str = 'longrun'
+
+    # Application Configuration
+    port: int = 8888
+    debug: bool = False
+    secret_key: str = 'your-secret-key-change-this'
+    max_content_length: int = 4096  # Auth payloads are tiny
+
+    # Waitress server tuning - password hashing blocks a worker thread for ~100ms
+    waitress_threads: int = max(16, 2 * (os.cpu_count() or 1))
+    waitress_backlog: int = 256
+    waitress_connection_limit: int = 1000
+
+    # Rate limiting
+    ratelimit_storage_uri: str = 'memory://'
+    login_rate_limit: str = '5 per minute;20 per hour'
+
+    # Password hashing - the cost is tuned for ~150ms per hash on commodity CPUs.
+    # Revisit the iteration count yearly as hardware gets faster.
+    password_hash_method: str = 'pbkdf2:sha256:600000'
+    password_salt_length: int = 16
+
+    @classmethod
+    def from_env(cls):
+        """Build settings from upper-case environment variables, coercing types"""
+        values = {}
+        for field in fields(cls):
+            raw = os.environ.get(field.name.upper())
+            if raw is None:
+                continue
+            if field.type is bool:
+                values[field.name] = _env_bool(raw)
+            elif field.type is int:
+                values[field.name] = int(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
+
+    def to_flask_config(self):
+        """Settings as upper-case keys for app.config"""
+        return {field.name.upper(): getattr(self, field.name) for field in fields(self)}
+
+@functools.cache
+def get_settings():
+    return Settings.from_env()
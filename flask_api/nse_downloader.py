@@ -1,59 +1,103 @@
 import requests
+import urllib3
+import atexit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import os
 from urllib.parse import urlparse
 import subprocess
+import shutil
 import threading
+import queue
+import sqlite3
+from io import BytesIO
+from lxml import etree
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# Headers to mimic a real browser, built once for every session/client
+_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Shared session so every downloader reuses pooled keep-alive connections.
+# Retries with exponential backoff are handled by urllib3.
+_SESSION = requests.Session()
+_RETRY_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+)
+_SESSION.mount('https://', _RETRY_ADAPTER)
+_SESSION.mount('http://', _RETRY_ADAPTER)
+_SESSION.headers.update(_HEADERS)
+
 class NSEDownloader:
     def __init__(self):
-        self.session = requests.Session()
-        # Add headers to mimic a real browser
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        self.session = _SESSION
+        self._http2_client = None
     
-    def method1_requests_with_retry(self, url, filename, max_retries=3, chunk_size=8192):
-        """Method 1: Robust requests with retry logic and chunked download"""
-        print(f"📥 Method 1: Downloading {filename} with retry...")
-        
-        for attempt in range(max_retries):
+    def get_http2_client(self):
+        """Shared HTTP/2 client that multiplexes range requests over one connection (requires httpx[http2])"""
+        if self._http2_client is None:
             try:
-                # Use longer timeout and stream download
-                response = self.session.get(
-                    url, 
-                    stream=True, 
-                    timeout=(30, 120),  # (connection timeout, read timeout)
-                    allow_redirects=True
+                import httpx
+                self._http2_client = httpx.Client(
+                    http2=True,
+                    # HTTP/2 forbids connection-specific headers
+                    headers={k: v for k, v in _HEADERS.items() if k != 'Connection'},
+                    follow_redirects=True,
+                    timeout=120
                 )
-                response.raise_for_status()
-                
-                # Download in chunks
-                with open(filename, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=chunk_size):
-                        if chunk:
-                            f.write(chunk)
-                
-                print(f"✅ Downloaded: {filename} ({os.path.getsize(filename)} bytes)")
-                return True
-                
-            except requests.exceptions.Timeout:
-                print(f"⏰ Timeout on attempt {attempt + 1}/{max_retries}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Request error on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
+            except ImportError:
+                return None
+        return self._http2_client
+    
+    def method1_requests_with_retry(self, url, filename, chunk_size=1024 * 1024):
+        """Method 1: Streamed requests download (retries handled by the session adapter)"""
+        print(f"📥 Method 1: Downloading {filename} with retry...")
         
-        print(f"❌ Failed to download {filename} after {max_retries} attempts")
+        try:
+            # Use longer timeout and stream download
+            response = self.session.get(
+                url, 
+                stream=True, 
+                timeout=(30, 120),  # (connection timeout, read timeout)
+                allow_redirects=True
+            )
+            response.raise_for_status()
+            
+            # Copy the raw stream to disk in large chunks (C-level loop);
+            # any gzip transfer encoding is undone by urllib3's native zlib
+            response.raw.decode_content = True
+            with open(filename, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=chunk_size)
+            
+            print(f"✅ Downloaded: {filename} ({os.path.getsize(filename)} bytes)")
+            return True
+            
+        except requests.exceptions.Timeout:
+            print(f"⏰ Timeout downloading {filename}")
+            
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Request error: {e}")
+        
+        # Reading response.raw skips requests' exception wrapping, so a dropped
+        # connection surfaces as a bare urllib3 error
+        except (urllib3.exceptions.HTTPError, OSError) as e:
+            print(f"❌ Stream error: {e}")
+        
+        # Don't leave a truncated file for the next method or a later exists check
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+        print(f"❌ Failed to download {filename}")
         return False
     
     def method2_curl_subprocess(self, url, filename):
@@ -71,11 +115,13 @@ class NSEDownloader:
                 '--retry', '3',  # Retry attempts
                 '--retry-delay', '2',  # Delay between retries
                 '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                '--compressed',  # Request gzip on the wire
+                '--silent', '--show-error',  # Only errors go to stderr
                 url
             ]
             
-            # Run curl
-            result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=360)
+            # Run curl - only stderr is captured, the file itself is written by curl
+            result = subprocess.run(curl_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=360)
             
             if result.returncode == 0 and os.path.exists(filename):
                 print(f"✅ Downloaded: {filename} ({os.path.getsize(filename)} bytes)")
@@ -105,10 +151,11 @@ class NSEDownloader:
                 '--timeout=30',  # Timeout
                 '--tries=3',  # Retry attempts
                 '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                '--no-verbose',  # Keep stderr to errors, no progress bar
                 url
             ]
             
-            result = subprocess.run(wget_cmd, capture_output=True, text=True, timeout=360)
+            result = subprocess.run(wget_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=360)
             
             if result.returncode == 0 and os.path.exists(filename):
                 print(f"✅ Downloaded: {filename} ({os.path.getsize(filename)} bytes)")
@@ -131,6 +178,9 @@ class NSEDownloader:
         """Method 4: Multi-threaded download (for large files)"""
         print(f"📥 Method 4: Multi-threaded download of {filename}...")
         
+        # Ranges land in a preallocated temp file that only becomes `filename` once every
+        # range has arrived in full - otherwise a short range would leave a zero-filled hole
+        partname = filename + '.part'
         try:
             # Get file size first
             head_response = self.session.head(url, timeout=30)
@@ -144,43 +194,72 @@ class NSEDownloader:
             # Calculate chunk size per thread
             chunk_size = file_size // num_threads
             
-            def download_chunk(start, end, chunk_filename):
-                headers = {'Range': f'bytes={start}-{end}'}
-                response = self.session.get(url, headers=headers, timeout=120)
-                with open(chunk_filename, 'wb') as f:
-                    f.write(response.content)
-                return chunk_filename
+            # Pre-allocate the output file so each thread can write its range in place
+            with open(partname, 'wb') as f:
+                if hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(f.fileno(), 0, file_size)
+                else:
+                    f.truncate(file_size)
+            
+            # Prefer one multiplexed HTTP/2 connection over one TCP+TLS connection per thread
+            http2_client = self.get_http2_client()
+            if http2_client is None:
+                print("ℹ️ httpx[http2] not installed, using one connection per thread")
+            
+            def download_chunk(start, end):
+                headers = {
+                    'Range': f'bytes={start}-{end}',
+                    'Accept-Encoding': 'identity'  # Ranges must address the file's own bytes
+                }
+                
+                # Write directly at this chunk's offset - no separate join phase
+                with open(partname, 'r+b') as f:
+                    f.seek(start)
+                    
+                    if http2_client is not None:
+                        with http2_client.stream('GET', url, headers=headers) as response:
+                            response.raise_for_status()
+                            if response.status_code != 206:
+                                raise IOError("Server ignored Range header")
+                            for chunk in response.iter_raw(1024 * 1024):
+                                f.write(chunk)
+                    else:
+                        response = self.session.get(url, headers=headers, stream=True, timeout=120)
+                        response.raise_for_status()
+                        if response.status_code != 206:
+                            raise IOError("Server ignored Range header")
+                        shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+                    
+                    written = f.tell() - start
+                    if written != end - start + 1:
+                        raise IOError(f"Range {start}-{end} cut short: got {written} of {end - start + 1} bytes")
+                return start
             
             # Download chunks in parallel
-            chunk_files = []
             with ThreadPoolExecutor(max_workers=num_threads) as executor:
                 futures = []
                 
                 for i in range(num_threads):
                     start = i * chunk_size
                     end = start + chunk_size - 1 if i < num_threads - 1 else file_size - 1
-                    chunk_filename = f"{filename}.part{i}"
-                    chunk_files.append(chunk_filename)
                     
-                    future = executor.submit(download_chunk, start, end, chunk_filename)
+                    future = executor.submit(download_chunk, start, end)
                     futures.append(future)
                 
                 # Wait for all chunks to complete
                 for future in as_completed(futures):
                     future.result()
             
-            # Combine chunks
-            with open(filename, 'wb') as outfile:
-                for chunk_file in chunk_files:
-                    with open(chunk_file, 'rb') as infile:
-                        outfile.write(infile.read())
-                    os.remove(chunk_file)  # Clean up
-            
+            os.replace(partname, filename)
             print(f"✅ Downloaded: {filename} ({os.path.getsize(filename)} bytes)")
             return True
             
         except Exception as e:
             print(f"❌ Multi-threaded download failed: {e}")
+            try:
+                os.remove(partname)
+            except FileNotFoundError:
+                pass
             return False
     
     def method5_browser_automation(self, url, filename):
@@ -281,8 +360,128 @@ class EnhancedNSEMonitor:
     def __init__(self, check_interval=300):
         self.rss_url = "https://nsearchives.nseindia.com/content/RSS/Online_announcements.xml"
         self.check_interval = check_interval
-        self.seen_items = set()
+        # Seen GUIDs persist across restarts in sqlite instead of an unbounded in-memory set
+        self.seen_db = sqlite3.connect("seen.sqlite", check_same_thread=False)
+        self.seen_db.execute("CREATE TABLE IF NOT EXISTS seen (guid TEXT PRIMARY KEY)")
+        self.seen_db.commit()
+        self._seen_lock = threading.Lock()
         self.downloader = NSEDownloader()
+        # Validators from the last feed response, for conditional GETs
+        self._etag = None
+        self._last_mod = None
+        # Downloads are I/O-bound, so overlap them on a small thread pool.
+        # The semaphore bounds queued work so long feeds don't balloon memory.
+        self.pool = ThreadPoolExecutor(max_workers=8)
+        self._inflight = threading.BoundedSemaphore(16)
+        # Failed downloads are appended by a single writer thread
+        self.fail_q = queue.Queue()
+        self._fail_thread = threading.Thread(target=self._fail_writer, daemon=True)
+        self._fail_thread.start()
+        # The writer batches for up to a second, so drain it before the interpreter exits
+        self._closed = False
+        atexit.register(self.close)
+    
+    def _fail_writer(self, max_batch=100, max_wait=1.0, fsync_every=10):
+        """Drain failed downloads from the queue and append them in batches"""
+        batches = 0
+        with open("failed_downloads.log", "a") as f:
+            while True:
+                item = self.fail_q.get()
+                if item is None:
+                    break
+                
+                batch = [item]
+                deadline = time.monotonic() + max_wait
+                while len(batch) < max_batch:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self.fail_q.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.fail_q.put(None)  # Stop after this batch
+                        break
+                    batch.append(item)
+                
+                f.write("".join(f"{pdf_url},{filename}\n" for pdf_url, filename in batch))
+                f.flush()
+                batches += 1
+                if batches % fsync_every == 0:
+                    os.fsync(f.fileno())
+            
+            os.fsync(f.fileno())
+    
+    def close(self):
+        """Wait for queued downloads and flush the failed-downloads log"""
+        if self._closed:
+            return
+        self._closed = True
+        self.pool.shutdown(wait=True)
+        self.fail_q.put(None)
+        self._fail_thread.join()
+        self.seen_db.close()
+    
+    def fetch_feed(self):
+        """Fetch the RSS feed, returning its bytes or None if unchanged since the last poll"""
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_mod:
+            headers['If-Modified-Since'] = self._last_mod
+        
+        response = self.downloader.session.get(self.rss_url, headers=headers, timeout=(30, 120))
+        if response.status_code == 304:
+            print("📭 RSS feed not modified since last check")
+            return None
+        response.raise_for_status()
+        
+        self._etag = response.headers.get('ETag')
+        self._last_mod = response.headers.get('Last-Modified')
+        return response.content
+    
+    def iter_feed_items(self, content):
+        """Stream (guid, link) pairs out of RSS bytes, freeing each <item> once read"""
+        for _, elem in etree.iterparse(BytesIO(content), events=('end',), tag='item'):
+            link = elem.findtext('link')
+            guid = elem.findtext('guid') or link
+            yield guid, link
+            
+            # Drop the processed item and any already-seen siblings
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    
+    def mark_seen(self, guid):
+        """Record an RSS item GUID, returning True if it had not been seen before"""
+        with self._seen_lock:
+            cursor = self.seen_db.execute("INSERT OR IGNORE INTO seen (guid) VALUES (?)", (guid,))
+            self.seen_db.commit()
+        return cursor.rowcount == 1
+    
+    def submit_download(self, pdf_url, filename):
+        """Queue a robust download on the pool, blocking if too many are in flight"""
+        self._inflight.acquire()
+        future = self.pool.submit(self.download_pdf_robust, pdf_url, filename)
+        future.add_done_callback(lambda _: self._inflight.release())
+        return future
+    
+    def download_all(self, items):
+        """Download (pdf_url, filename) pairs concurrently, returning {filename: success}"""
+        futures = {self.submit_download(pdf_url, filename): filename for pdf_url, filename in items}
+        
+        results = {}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                results[filename] = future.result()
+            except Exception as e:
+                print(f"❌ Download error for {filename}: {e}")
+                results[filename] = False
+        
+        print(f"📊 Downloaded {sum(results.values())}/{len(results)} files")
+        return results
     
     def download_pdf_robust(self, pdf_url, filename):
         """Enhanced PDF download with multiple fallback methods"""
@@ -300,7 +499,6 @@ class EnhancedNSEMonitor:
         else:
             print(f"❌ Failed to download: {filename}")
             # Log the failed download for manual retry later
-            with open("failed_downloads.log", "a") as f:
-                f.write(f"{pdf_url},{filename}\n")
+            self.fail_q.put((pdf_url, filename))
         
         return success
\ No newline at end of file
@@ -1,154 +1,360 @@
 import feedparser
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachecontrol import CacheControl
+from cachecontrol.caches.file_cache import FileCache
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import xml.etree.ElementTree as ET
 import json
+import orjson
+import hashlib
 import os
+import re
+import shutil
+import sys
+import atexit
+import xxhash
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from io import StringIO
+from collections import OrderedDict, deque
+
+# Matches one complete <item> element in raw feed bytes; a truncated trailing item never matches
+_ITEM_RE = re.compile(rb'<item\b.*?</item>', re.DOTALL)
+
+# NSE trading session (IST has no DST, so a fixed offset is enough)
+_IST = timezone(timedelta(hours=5, minutes=30))
+_MARKET_OPEN = (9, 15)
+_MARKET_CLOSE = (15, 30)
+
+# Splits an NSE description into its body and the "|SUBJECT:" trailer
+_SUBJECT_RE = re.compile(r'^(.*?)\|SUBJECT:(.*)$', re.DOTALL)
+
+_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
+}
+
+def parse_nse_date(value):
+    """Parse NSE's fixed "08-Aug-2025 14:31:29" format without strptime's overhead"""
+    try:
+        date_part, time_part = value.split(' ')
+        day, month, year = date_part.split('-')
+        hour, minute, second = time_part.split(':')
+        return datetime(int(year), _MONTHS[month], int(day), int(hour), int(minute), int(second))
+    except (KeyError, ValueError):
+        raise ValueError(f"unrecognised NSE date: {value!r}")
+
+class _HashingReader:
+    """File-like wrapper that hashes bytes as copyfileobj pulls them through"""
+    def __init__(self, raw):
+        self.raw = raw
+        self.hash = hashlib.sha1()
+    
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.hash.update(data)
+        return data
 
 class IncrementalNSEMonitor:
-    def __init__(self, check_interval=300, max_items_to_process=20, download_pdfs=False):
+    def __init__(self, check_interval=300, max_items_to_process=20, download_pdfs=False, verbose=True):
         self.rss_url = "https://nsearchives.nseindia.com/content/RSS/Online_announcements.xml"
         self.check_interval = check_interval
+        self.base_check_interval = check_interval
+        self.min_check_interval = 30
+        self.max_check_interval = 1800
+        self.poll_history = deque(maxlen=20)  # New items found by each recent poll
+        self.new_items_this_poll = 0
         self.max_items_to_process = max_items_to_process  # Only process latest N items
         self.download_pdfs = download_pdfs  # Whether to download PDFs
+        self.verbose = verbose  # Print each new announcement (counts are always reported)
         self.last_check_time = None
-        self.seen_items = set()
+        # LRU of seen item IDs - the feed only ever holds the newest few hundred items,
+        # so anything older than ~4x that window will never be queried again
+        self.seen_items = OrderedDict()
+        self.max_seen_items = 2000
+        self.etag = None  # HTTP validators from the last full RSS download
+        self.last_modified = None
         self.cache_file = "nse_incremental_cache.json"
+        self.seen_log_file = "nse_seen.log"  # Append-only log of seen item IDs
+        self._seen_log = None
+        self._seen_log_lines = 0
+        self._retry_lock = threading.Lock()  # Guards retry_downloads.json during parallel downloads
+        self.pdf_index_file = "nse_pdf_index.json"  # sha1 of PDF bytes -> first saved path
+        self.pdf_index = {}
+        self._pdf_index_lock = threading.Lock()
+        
+        # Download log stays open (block-buffered) instead of being reopened per file;
+        # it is flushed and closed at interpreter exit
+        self.download_log = open("download_log.txt", "a", buffering=8192)
+        self._download_log_lock = threading.Lock()
+        atexit.register(self.download_log.close)
+        
+        # One keep-alive session for PDF downloads and RSS Range requests, plus a
+        # second one for full RSS fetches that honours Cache-Control/ETag across runs.
+        # PDFs stay out of the HTTP cache - they are already kept in nse_downloads/
+        self.session = self._new_session()
+        self.feed_session = CacheControl(self._new_session(), cache=FileCache('.webcache'))
+        
         self.load_cache()
+        self.load_seen_log()
+        self.load_pdf_index()
+    
+    @staticmethod
+    def _new_session():
+        """Keep-alive session with retrying adapters and browser-like headers"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=1,
+                status_forcelist=[408, 429, 500, 502, 503, 504],
+                allowed_methods=['GET']
+            )
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        return session
     
     def load_cache(self):
         """Load cache with last check time"""
         try:
             if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    self.seen_items = set(cache_data.get('seen_items', []))
+                with open(self.cache_file, 'rb') as f:
+                    cache_data = orjson.loads(f.read())
+                    # Older caches stored seen item strings inline; they are migrated into the log
+                    self.seen_items = OrderedDict((self.hash_item_key(k), None) for k in cache_data.get('seen_items', []))
                     
                     # Load last check time
                     if cache_data.get('last_check_time'):
                         self.last_check_time = datetime.fromisoformat(cache_data['last_check_time'])
                     
-                print(f"📂 Loaded cache: {len(self.seen_items)} items, last check: {self.last_check_time}")
+                    self.etag = cache_data.get('etag')
+                    self.last_modified = cache_data.get('last_modified')
+                    
+                print(f"📂 Loaded cache: last check: {self.last_check_time}")
         except Exception as e:
             print(f"❌ Error loading cache: {e}")
     
     def save_cache(self):
-        """Save cache with current time"""
+        """Save cache with the start time of the last successful check"""
         try:
             cache_data = {
-                'seen_items': list(self.seen_items),
-                'last_check_time': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
+                # Not now() - a failed poll must not move the cutoff past items it never saw
+                'last_check_time': self.last_check_time.isoformat() if self.last_check_time else None,
+                'last_updated': datetime.now().isoformat(),
+                'etag': self.etag,
+                'last_modified': self.last_modified
             }
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2)
+            with open(self.cache_file, 'wb') as f:
+                f.write(orjson.dumps(cache_data))
+            
+            # Seen items are already persisted by mark_seen(); just compact the log if it has bloated
+            if self._seen_log_lines > 2 * len(self.seen_items):
+                self.compact_seen_log()
         except Exception as e:
             print(f"❌ Error saving cache: {e}")
     
-    def method1_process_only_latest_items(self):
-        """Method 1: Download full RSS but only process first N items"""
-        print(f"📡 Method 1: Processing only latest {self.max_items_to_process} items...")
-        
+    def load_seen_log(self):
+        """Replay the seen-items log and open it for appending"""
         try:
-            response = requests.get(self.rss_url, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # Parse RSS but limit processing
-            feed = feedparser.parse(response.content)
-            
-            # Get file size info
-            content_length = response.headers.get('content-length', 'unknown')
-            print(f"📊 RSS feed size: {content_length} bytes")
-            
-            if not feed.entries:
-                print("❌ No entries found")
-                return
-            
-            print(f"📈 Total entries in feed: {len(feed.entries)}")
-            print(f"🎯 Processing only latest {self.max_items_to_process} entries")
+            if os.path.exists(self.seen_log_file):
+                with open(self.seen_log_file, 'r') as f:
+                    for line in f:
+                        item_id = line.rstrip('\n')
+                        if item_id:
+                            # Entries written before IDs were hashed are hashed on load
+                            item_id = int(item_id) if item_id.isdigit() else self.hash_item_key(item_id)
+                            self.seen_items[item_id] = None
+                            self.seen_items.move_to_end(item_id)
+                            self._seen_log_lines += 1
+            
+            while len(self.seen_items) > self.max_seen_items:
+                self.seen_items.popitem(last=False)
+            
+            # Items migrated from an older JSON cache aren't in the log yet
+            if self._seen_log_lines != len(self.seen_items):
+                self.compact_seen_log()
+            else:
+                self._seen_log = open(self.seen_log_file, 'a')
             
-            # Process only the latest items (RSS is typically ordered newest first)
-            latest_entries = feed.entries[:self.max_items_to_process]
+            print(f"📂 Loaded {len(self.seen_items)} seen items")
+        except Exception as e:
+            print(f"❌ Error loading seen log: {e}")
+    
+    def compact_seen_log(self):
+        """Atomically rewrite the seen-items log with exactly the current set"""
+        tmp_file = self.seen_log_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(''.join(f"{item_id}\n" for item_id in self.seen_items))
+        
+        if self._seen_log:
+            self._seen_log.close()
+        os.replace(tmp_file, self.seen_log_file)
+        self._seen_log = open(self.seen_log_file, 'a')
+        self._seen_log_lines = len(self.seen_items)
+    
+    def load_pdf_index(self):
+        """Load the content-hash index of downloaded PDFs"""
+        try:
+            if os.path.exists(self.pdf_index_file):
+                with open(self.pdf_index_file, 'rb') as f:
+                    self.pdf_index = orjson.loads(f.read())
+        except Exception as e:
+            print(f"⚠️ Error loading PDF index: {e}")
+    
+    def dedupe_pdf(self, digest, filepath):
+        """Record a freshly downloaded PDF by content hash, replacing duplicates with a symlink"""
+        with self._pdf_index_lock:
+            original = self.pdf_index.get(digest)
+            if original and original != filepath and os.path.exists(original):
+                try:
+                    os.remove(filepath)
+                    os.symlink(os.path.relpath(original, os.path.dirname(filepath)), filepath)
+                    print(f"🔗 Duplicate of {os.path.basename(original)}, linked instead of stored")
+                except OSError as e:
+                    print(f"⚠️ Could not link duplicate PDF: {e}")
+                return True
             
-            new_count = 0
-            for entry in latest_entries:
-                item_id = self.generate_item_id(entry)
+            self.pdf_index[digest] = filepath
+            with open(self.pdf_index_file, 'wb') as f:
+                f.write(orjson.dumps(self.pdf_index))
+            return False
+    
+    def log_download(self, line):
+        """Append a line to the shared download log"""
+        with self._download_log_lock:
+            self.download_log.write(line)
+    
+    def mark_seen(self, item_id):
+        """Record an item ID, returning True if it had not been seen before"""
+        if item_id in self.seen_items:
+            self.seen_items.move_to_end(item_id)
+            return False
+        
+        self.seen_items[item_id] = None
+        self.new_items_this_poll += 1
+        if len(self.seen_items) > self.max_seen_items:
+            self.seen_items.popitem(last=False)
+        if self._seen_log:
+            self._seen_log.write(f"{item_id}\n")
+            self._seen_log.flush()
+            self._seen_log_lines += 1
+        return True
+    
+    def _fetch_and_iterate_items(self, limit=None, since=None):
+        """Stream the feed once, yielding (item_id, item dict) for its newest items.
+        
+        Stops after `limit` items, or at the first item published at or before
+        `since` (the feed is newest first). Yields nothing if the feed is unchanged.
+        """
+        # Conditional GET - the server answers 304 with no body if the feed is unchanged
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        
+        response = self.feed_session.get(self.rss_url, headers=headers, timeout=30, stream=True)
+        # CacheControl answers a revalidated (or still fresh) feed from .webcache as a 200,
+        # so a cached copy carrying the validators we already hold is an unchanged feed too
+        unchanged_from_cache = (
+            getattr(response, 'from_cache', False)
+            and (self.etag or self.last_modified)
+            and (response.headers.get('ETag'), response.headers.get('Last-Modified')) == (self.etag, self.last_modified)
+        )
+        if response.status_code == 304 or unchanged_from_cache:
+            print("📭 304 Not Modified - RSS feed unchanged since last check")
+            response.close()
+            return
+        response.raise_for_status()
+        
+        # Validators are only stored once the items have been handed out - if parsing or the
+        # connection fails partway, the next poll must download this feed version again
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        # Get file size info
+        content_length = response.headers.get('content-length', 'unknown')
+        print(f"📊 RSS feed size: {content_length} bytes")
+        
+        # Parse straight off the socket and stop as soon as we have what we need
+        response.raw.decode_content = True
+        count = 0
+        try:
+            for event, elem in ET.iterparse(response.raw, events=("end",)):
+                if elem.tag != "item":
+                    continue
                 
-                if item_id not in self.seen_items:
-                    self.seen_items.add(item_id)
-                    new_count += 1
-                    self.print_announcement(entry, is_new=True, download_pdf=self.download_pdfs)
-            
-            print(f"✅ Processed {len(latest_entries)} latest items, found {new_count} new")
+                item_data = self.item_to_dict(elem)
+                elem.clear()
+                
+                if since is not None and self.is_older_than_last_check(item_data, since):
+                    break
+                
+                yield self.generate_item_id(item_data), item_data
+                count += 1
+                if limit is not None and count >= limit:
+                    break
+            self.etag, self.last_modified = etag, last_modified
+        finally:
+            response.close()
+    
+    def _process_new_items(self, items):
+        """Print and queue downloads for unseen items; returns (candidates, new)"""
+        candidates = 0
+        new_count = 0
+        pending_downloads = []
+        for item_id, entry in items:
+            candidates += 1
+            if self.mark_seen(item_id):
+                new_count += 1
+                self.print_announcement_from_dict(entry, is_new=True)
+                if self.download_pdfs and entry.get('link'):
+                    pending_downloads.append(entry)
+        
+        # Downloads are independent and network-bound, so run them concurrently
+        self.download_pending_pdfs(pending_downloads)
+        return candidates, new_count
+    
+    def method1_process_only_latest_items(self):
+        """Method 1: Stream-parse the RSS and stop after the first N items; returns True on success"""
+        print(f"📡 Method 1: Processing only latest {self.max_items_to_process} items...")
+        
+        try:
+            candidates, new_count = self._process_new_items(
+                self._fetch_and_iterate_items(limit=self.max_items_to_process)
+            )
+            print(f"✅ Processed {candidates} latest items, found {new_count} new")
+            return True
             
         except Exception as e:
             print(f"❌ Error in method 1: {e}")
+            return False
     
     def method2_streaming_xml_parser(self):
         """Method 2: Stream XML and stop after processing N items"""
         print(f"📡 Method 2: Streaming XML parser (stop after {self.max_items_to_process} items)...")
         
         try:
-            response = requests.get(self.rss_url, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # Stream and parse XML incrementally
-            items_processed = 0
-            new_count = 0
-            current_item = {}
-            in_item = False
-            current_tag = None
-            content = ""
-            
-            print("🔄 Streaming XML content...")
-            
-            # Read content in chunks
-            xml_content = ""
-            for chunk in response.iter_content(chunk_size=8192, decode_unicode=True):
-                xml_content += chunk
-                
-                # Process XML as we get it
-                while '<item>' in xml_content and items_processed < self.max_items_to_process:
-                    # Extract one complete item
-                    start = xml_content.find('<item>')
-                    end = xml_content.find('</item>') + 7
-                    
-                    if start != -1 and end != -1 and end > start:
-                        item_xml = xml_content[start:end]
-                        xml_content = xml_content[end:]  # Remove processed item
-                        
-                        # Parse this item
-                        try:
-                            root = ET.fromstring(item_xml)
-                            item_data = {}
-                            
-                            for child in root:
-                                item_data[child.tag] = child.text or ""
-                            
-                            # Check if new
-                            item_id = f"{item_data.get('title', '')}-{item_data.get('pubDate', '')}"
-                            
-                            if item_id not in self.seen_items:
-                                self.seen_items.add(item_id)
-                                new_count += 1
-                                self.print_announcement_from_dict(item_data, is_new=True)
-                            
-                            items_processed += 1
-                            
-                        except ET.ParseError as e:
-                            print(f"⚠️ XML parse error for item: {e}")
-                    else:
-                        break  # Need more content
-                
-                # Stop if we've processed enough items
-                if items_processed >= self.max_items_to_process:
-                    print(f"🛑 Stopping after processing {items_processed} items")
-                    break
-            
-            print(f"✅ Streamed processing: {items_processed} items, {new_count} new")
+            candidates, new_count = self._process_new_items(
+                self._fetch_and_iterate_items(limit=self.max_items_to_process)
+            )
+            print(f"✅ Streamed processing: {candidates} items, {new_count} new")
             
+        except ET.ParseError as e:
+            print(f"⚠️ XML parse error: {e}")
         except Exception as e:
             print(f"❌ Error in method 2: {e}")
     
@@ -156,56 +362,18 @@ class IncrementalNSEMonitor:
         """Method 3: Process items only from last check time"""
         print("📡 Method 3: Time-based filtering...")
         
-        if self.last_check_time is None:
-            print("⚠️ No last check time, processing latest 10 items")
-            self.max_items_to_process = 10
-            return self.method1_process_only_latest_items()
-        
         try:
-            feed = feedparser.parse(self.rss_url)
-            
-            if not feed.entries:
-                print("❌ No entries found")
-                return
+            if self.last_check_time is None:
+                print("⚠️ No last check time, processing latest 10 items")
+                items = self._fetch_and_iterate_items(limit=10)
+            else:
+                print(f"🕐 Last check: {self.last_check_time}")
+                items = self._fetch_and_iterate_items(since=self.last_check_time)
             
-            print(f"📈 Total entries: {len(feed.entries)}")
-            print(f"🕐 Last check: {self.last_check_time}")
-            
-            # Filter items newer than last check
-            new_items = []
-            for entry in feed.entries:
-                try:
-                    # Parse publication date
-                    pub_date_str = entry.get('published', '')
-                    if pub_date_str:
-                        # NSE format: "08-Aug-2025 14:31:29"
-                        pub_date = datetime.strptime(pub_date_str, "%d-%b-%Y %H:%M:%S")
-                        
-                        if pub_date > self.last_check_time:
-                            new_items.append(entry)
-                        else:
-                            # Since RSS is chronological, we can stop here
-                            break
-                            
-                except ValueError as e:
-                    print(f"⚠️ Date parse error: {pub_date_str} - {e}")
-                    # Include item if we can't parse date
-                    new_items.append(entry)
-            
-            print(f"📊 Found {len(new_items)} items newer than last check")
-            
-            # Process new items
-            new_count = 0
-            for entry in new_items:
-                item_id = self.generate_item_id(entry)
-                
-                if item_id not in self.seen_items:
-                    self.seen_items.add(item_id)
-                    new_count += 1
-                    self.print_announcement(entry, is_new=True)
+            candidates, new_count = self._process_new_items(items)
             
             self.last_check_time = datetime.now()
-            print(f"✅ Time-based filter: {len(new_items)} candidates, {new_count} truly new")
+            print(f"✅ Time-based filter: {candidates} candidates, {new_count} truly new")
             
         except Exception as e:
             print(f"❌ Error in method 3: {e}")
@@ -216,69 +384,182 @@ class IncrementalNSEMonitor:
         
         try:
             # Request only first 50KB of the file
-            headers = {'Range': 'bytes=0-51200'}  # First 50KB
-            response = requests.get(self.rss_url, headers=headers, timeout=30)
+            headers = {
+                'Range': 'bytes=0-51200',  # First 50KB
+                'Accept-Encoding': 'identity'  # Ranges must address the raw XML bytes
+            }
+            # Streamed so a server that ignores Range doesn't make us buffer the whole feed
+            response = self.session.get(self.rss_url, headers=headers, timeout=30, stream=True)
             
             if response.status_code == 206:  # Partial Content
                 print("✅ Got partial content (first 50KB)")
-                partial_xml = response.text
-                
-                # Try to make it valid XML by adding closing tags if needed
-                if '</rss>' not in partial_xml:
-                    # Find last complete item
-                    last_complete_item = partial_xml.rfind('</item>')
-                    if last_complete_item != -1:
-                        partial_xml = partial_xml[:last_complete_item + 7] + '\n</channel>\n</rss>'
                 
-                # Parse partial XML
-                try:
-                    feed = feedparser.parse(partial_xml)
-                    
-                    if feed.entries:
-                        print(f"📊 Parsed {len(feed.entries)} items from partial content")
-                        
-                        new_count = 0
-                        for entry in feed.entries:
-                            item_id = self.generate_item_id(entry)
-                            
-                            if item_id not in self.seen_items:
-                                self.seen_items.add(item_id)
-                                new_count += 1
-                                self.print_announcement(entry, is_new=True)
-                        
-                        print(f"✅ Range request: {len(feed.entries)} items, {new_count} new")
-                    else:
-                        print("⚠️ No complete items in partial content")
-                        
-                except Exception as parse_error:
-                    print(f"❌ Failed to parse partial XML: {parse_error}")
-                    # Fallback to method 1
-                    return self.method1_process_only_latest_items()
+                # Pull complete items straight out of the bytes - no need to patch up
+                # the truncated document for a full parse
+                response.raw.decode_content = True
+                items = ((self.generate_item_id(item), item) for item in self.iter_raw_items(response.raw))
             else:
-                print("⚠️ Server doesn't support range requests, falling back...")
-                return self.method1_process_only_latest_items()
+                response.close()
+                print("⚠️ Server doesn't support range requests, streaming the full feed...")
+                items = self._fetch_and_iterate_items(limit=self.max_items_to_process)
             
+            candidates, new_count = self._process_new_items(items)
+            if candidates:
+                print(f"✅ Range request: {candidates} items, {new_count} new")
+            else:
+                print("⚠️ No complete items found")
+            
+        except ET.ParseError as e:
+            print(f"❌ Failed to parse partial XML: {e}")
         except Exception as e:
             print(f"❌ Error in method 4: {e}")
     
+    def method5_incremental_range_requests(self, initial_bytes=65536, max_bytes=8 * 1024 * 1024):
+        """Method 5: Range-fetch the head of the feed, extending only until we pass the last check.
+        
+        Returns False if the server doesn't support range requests.
+        """
+        print("📡 Method 5: Incremental HTTP Range requests...")
+        
+        try:
+            parser = ET.XMLPullParser(events=('end',))
+            items = []
+            start = 0
+            size = initial_bytes
+            
+            while True:
+                headers = {
+                    'Range': f'bytes={start}-{start + size - 1}',
+                    'Accept-Encoding': 'identity'  # Ranges must address the raw XML bytes
+                }
+                # Streamed so a server that ignores Range and answers 200 doesn't send us the
+                # whole feed here and then again on the full-download fallback
+                response = self.session.get(self.rss_url, headers=headers, timeout=30, stream=True)
+                if response.status_code != 206:
+                    response.close()
+                    print("⚠️ Server doesn't support range requests")
+                    return False
+                
+                parser.feed(response.content)
+                for event, elem in parser.read_events():
+                    if elem.tag == 'item':
+                        items.append(self.item_to_dict(elem))
+                        elem.clear()
+                
+                start += len(response.content)
+                total_size = response.headers.get('Content-Range', '').rpartition('/')[2]
+                
+                # Stop at end of file, at the size cap, or once we've covered everything new
+                if not response.content or (total_size.isdigit() and start >= int(total_size)):
+                    break
+                if start >= max_bytes:
+                    break
+                if self.last_check_time is None:
+                    if len(items) >= self.max_items_to_process:
+                        break
+                elif items and self.is_older_than_last_check(items[-1]):
+                    break
+                
+                size *= 2
+            
+            print(f"📊 Fetched {start:,} bytes, parsed {len(items)} items")
+            
+            # RSS is chronological, so keep items until the first one we've already covered
+            if self.last_check_time is None:
+                new_items = items[:self.max_items_to_process]
+            else:
+                new_items = []
+                for item in items:
+                    if self.is_older_than_last_check(item):
+                        break
+                    new_items.append(item)
+            
+            _, new_count = self._process_new_items((self.generate_item_id(item), item) for item in new_items)
+            print(f"✅ Range requests: {len(new_items)} candidates, {new_count} new")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error in method 5: {e}")
+            return False
+    
+    def is_older_than_last_check(self, item, since=None):
+        """True if the item's pubDate is at or before the last check (unparseable dates count as new)"""
+        try:
+            return parse_nse_date(item.get('pubDate', '')) <= (since or self.last_check_time)
+        except ValueError:
+            return False
+    
     def smart_incremental_check(self):
         """Smart method selection - now with RSS fetch fallbacks"""
         print(f"\n🔍 Incremental check at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Skip the HEAD request entirely - just try processing
-        print("🎯 Using latest items method with smart RSS fetching")
+        # Range requests only pull the head of the feed; fall back to a full
+        # (streamed, conditional) download if the server won't serve ranges
+        print("🎯 Using incremental range requests with full-download fallback")
         
+        # Anything published after this point is left for the next poll to pick up
+        poll_started = datetime.now()
         try:
-            self.method1_process_only_latest_items()
+            if self.method5_incremental_range_requests() or self.method1_process_only_latest_items():
+                self.last_check_time = poll_started
             self.save_cache()
             
         except Exception as e:
             print(f"❌ Smart check failed: {e}")
             print("🔄 RSS feed may be temporarily unavailable")
     
+    @staticmethod
+    def is_market_hours(now=None):
+        """Whether NSE is in its weekday trading session (09:15-15:30 IST)"""
+        now = now or datetime.now(_IST)
+        return now.weekday() < 5 and _MARKET_OPEN <= (now.hour, now.minute) < _MARKET_CLOSE
+    
+    def adapt_check_interval(self, new_count):
+        """Shorten the poll interval while announcements are flowing, lengthen it when quiet"""
+        self.poll_history.append(new_count)
+        recent_rate = sum(self.poll_history) / len(self.poll_history)
+        
+        interval = self.base_check_interval / (1 + recent_rate)
+        if not self.is_market_hours():
+            interval *= 5
+        
+        self.check_interval = int(min(max(interval, self.min_check_interval), self.max_check_interval))
+        return self.check_interval
+    
     def generate_item_id(self, entry):
-        """Generate unique ID for RSS entry"""
-        return f"{entry.get('title', '')}-{entry.get('published', '')}-{entry.get('link', '')}"
+        """Generate a 64-bit ID for an RSS entry (feedparser entry or raw item dict)"""
+        published = entry.get('published') or entry.get('pubDate', '')
+        return self.hash_item_key(f"{entry.get('title', '')}-{published}-{entry.get('link', '')}")
+    
+    @staticmethod
+    def hash_item_key(key):
+        """Hash an item key string to a small int - far cheaper to keep in a set than the string"""
+        return xxhash.xxh64_intdigest(key.encode())
+    
+    @staticmethod
+    def item_to_dict(elem):
+        """Flatten an RSS <item> element into a dict of child tag -> text"""
+        return {child.tag: (child.text or '').strip() for child in elem}
+    
+    def iter_raw_items(self, raw, chunk_size=16384):
+        """Yield complete <item> dicts from a byte stream without holding the whole body"""
+        buf = bytearray()
+        scan_from = 0
+        while True:
+            chunk = raw.read(chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+            
+            match = _ITEM_RE.search(buf, scan_from)
+            while match:
+                yield self.item_to_dict(ET.fromstring(bytes(match.group())))
+                scan_from = match.end()
+                match = _ITEM_RE.search(buf, scan_from)
+            
+            # Drop bytes we've fully scanned
+            del buf[:scan_from]
+            scan_from = 0
     
     def download_pdf_with_smart_fallback(self, pdf_url, filename):
         """Smart PDF download with multiple fallback methods"""
@@ -300,207 +581,143 @@ class IncrementalNSEMonitor:
         
         print(f"📥 Smart downloading: {filename}")
         
-        # Method 1: Enhanced requests with retry
+        # Retries with backoff are handled by the session adapter
         if self._download_method_requests(pdf_url, filepath):
             return True
         
-        # Method 2: Try curl subprocess
-        if self._download_method_curl(pdf_url, filepath):
-            return True
-        
-        # Method 3: Try wget subprocess  
-        if self._download_method_wget(pdf_url, filepath):
-            return True
-        
-        # All methods failed
-        print(f"❌ All download methods failed for: {filename}")
+        print(f"❌ Download failed for: {filename}")
         return False
     
     def _download_method_requests(self, pdf_url, filepath):
-        """Method 1: Enhanced requests with better error handling"""
-        print("🔄 Trying enhanced requests method...")
-        
-        for attempt in range(3):
-            try:
-                session = requests.Session()
-                session.headers.update({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Connection': 'keep-alive'
-                })
-                
-                response = session.get(
-                    pdf_url, 
-                    timeout=(30, 300),  # 30s connection, 300s read
-                    stream=True,
-                    allow_redirects=True
-                )
-                response.raise_for_status()
-                
-                # Download in chunks
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                file_size = os.path.getsize(filepath)
-                print(f"✅ Requests method success: {os.path.basename(filepath)} ({file_size:,} bytes)")
-                
-                # Log successful download
-                with open("download_log.txt", "a") as log:
-                    log.write(f"{datetime.now()}: {os.path.basename(filepath)} - {file_size} bytes - requests\n")
-                
-                return True
-                
-            except requests.exceptions.Timeout:
-                print(f"⏰ Requests timeout (attempt {attempt + 1}/3)")
-                if attempt < 2:
-                    time.sleep(2 ** attempt)
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Requests error (attempt {attempt + 1}/3): {e}")
-                if attempt < 2:
-                    time.sleep(2)
-                    
-            except Exception as e:
-                print(f"❌ Unexpected requests error: {e}")
-                break
-                
-        return False
-    
-    def _download_method_curl(self, pdf_url, filepath):
-        """Method 2: Use curl subprocess"""
-        print("🔄 Trying curl method...")
-        
+        """Stream a PDF to disk over the shared session"""
         try:
-            import subprocess
-            
-            curl_cmd = [
-                'curl',
-                '-L',  # Follow redirects
-                '-o', filepath,
-                '--connect-timeout', '30',
-                '--max-time', '300',
-                '--retry', '3',
-                '--retry-delay', '2',
-                '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                '--silent',  # Reduce output
-                pdf_url
-            ]
-            
-            result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=360)
-            
-            if result.returncode == 0 and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
-                print(f"✅ Curl method success: {os.path.basename(filepath)} ({file_size:,} bytes)")
-                
-                with open("download_log.txt", "a") as log:
-                    log.write(f"{datetime.now()}: {os.path.basename(filepath)} - {file_size} bytes - curl\n")
-                
-                return True
-            else:
-                if os.path.exists(filepath):
-                    os.remove(filepath)  # Clean up partial file
-                print(f"❌ Curl failed: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("⏰ Curl command timed out")
-            return False
-        except FileNotFoundError:
-            print("❌ Curl not found - install curl or skip this method")
-            return False
+            response = self.session.get(
+                pdf_url, 
+                timeout=(30, 300),  # 30s connection, 300s read
+                stream=True,
+                allow_redirects=True
+            )
+            response.raise_for_status()
+            
+            # Copy the raw stream to disk in 1 MiB chunks (C-level loop); any gzip
+            # transfer encoding is undone by urllib3
+            response.raw.decode_content = True
+            total = int(response.headers.get('Content-Length', 0))
+            with open(filepath, 'wb') as f:
+                # Preallocate when the on-disk size is known up front
+                if total and 'Content-Encoding' not in response.headers and hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(f.fileno(), 0, total)
+                reader = _HashingReader(response.raw)
+                shutil.copyfileobj(reader, f, length=1 << 20)
+                f.truncate()
+            
+            file_size = os.path.getsize(filepath)
+            print(f"✅ Downloaded: {os.path.basename(filepath)} ({file_size:,} bytes)")
+            self.dedupe_pdf(reader.hash.hexdigest(), filepath)
+            
+            # Log successful download
+            self.log_download(f"{datetime.now()}: {os.path.basename(filepath)} - {file_size} bytes - requests\n")
+            
+            return True
+            
+        except requests.exceptions.Timeout:
+            print(f"⏰ Download timed out: {os.path.basename(filepath)}")
+            
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Download error: {e}")
+            
         except Exception as e:
-            print(f"❌ Curl error: {e}")
-            return False
-    
-    def _download_method_wget(self, pdf_url, filepath):
-        """Method 3: Use wget subprocess"""
-        print("🔄 Trying wget method...")
+            print(f"❌ Unexpected download error: {e}")
         
-        try:
-            import subprocess
-            
-            wget_cmd = [
-                'wget',
-                '-O', filepath,
-                '--timeout=30',
-                '--tries=3',
-                '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                '--quiet',  # Reduce output
-                pdf_url
-            ]
-            
-            result = subprocess.run(wget_cmd, capture_output=True, text=True, timeout=360)
-            
-            if result.returncode == 0 and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
-                print(f"✅ Wget method success: {os.path.basename(filepath)} ({file_size:,} bytes)")
-                
-                with open("download_log.txt", "a") as log:
-                    log.write(f"{datetime.now()}: {os.path.basename(filepath)} - {file_size} bytes - wget\n")
-                
-                return True
-            else:
-                if os.path.exists(filepath):
-                    os.remove(filepath)  # Clean up partial file
-                print(f"❌ Wget failed: {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            print("⏰ Wget command timed out")
-            return False
-        except FileNotFoundError:
-            print("❌ Wget not found - install wget or skip this method")
-            return False
-        except Exception as e:
-            print(f"❌ Wget error: {e}")
-            return False
+        # Don't leave a partial file behind - it would be skipped as "already exists"
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return False
+    
+    def format_announcement(self, title, date, link, description):
+        """Render an announcement as one block of text so it can be written in a single call"""
+        lines = [
+            f"\n🆕 {'-'*70}",
+            f"🏢 COMPANY: {title}",
+            f"📅 DATE: {date}",
+            f"🔗 DOCUMENT: {link}",
+        ]
+        match = _SUBJECT_RE.match(description) if '|SUBJECT:' in description else None
+        if match:
+            lines.append(f"📋 DESCRIPTION: {match.group(1).strip()}")
+            lines.append(f"🏷️  SUBJECT: {match.group(2).strip()}")
+        else:
+            lines.append(f"📋 DESCRIPTION: {description}")
+        return "\n".join(lines) + "\n"
     
     def print_announcement(self, entry, is_new=False, download_pdf=False):
         """Print RSS entry announcement"""
-        print(f"\n🆕 {'-'*70}")
-        print(f"🏢 COMPANY: {entry.get('title', 'Unknown')}")
-        print(f"📅 DATE: {entry.get('published', 'No Date')}")
-        
         pdf_link = entry.get('link', 'No Link')
-        print(f"🔗 DOCUMENT: {pdf_link}")
-        
-        description = entry.get('description', '')
-        if '|SUBJECT:' in description:
-            main_desc, subject = description.split('|SUBJECT:', 1)
-            print(f"📋 DESCRIPTION: {main_desc.strip()}")
-            print(f"🏷️  SUBJECT: {subject.strip()}")
-        else:
-            print(f"📋 DESCRIPTION: {description}")
+        if self.verbose:
+            sys.stdout.write(self.format_announcement(
+                entry.get('title', 'Unknown'),
+                entry.get('published', 'No Date'),
+                pdf_link,
+                entry.get('description', '')
+            ))
         
         # Optional PDF download for new announcements
         if download_pdf and is_new and pdf_link != 'No Link':
-            # Clean filename
-            company_name = entry.get('title', 'Unknown').replace(' ', '_').replace('/', '_').replace('\\', '_')
-            pub_date = entry.get('published', '').replace('-', '').replace(' ', '_').replace(':', '').replace(',', '')
-            
-            # Create safe filename
-            safe_filename = f"{company_name}_{pub_date}.pdf"
-            # Remove any remaining unsafe characters
-            safe_filename = "".join(c for c in safe_filename if c.isalnum() or c in '._-')
-            
-            print(f"🎯 New announcement detected - attempting smart PDF download...")
-            success = self.download_pdf_with_smart_fallback(pdf_link, safe_filename)
-            
-            if not success:
-                # Store failed download for retry later
-                failed_item = {
-                    'url': pdf_link,
-                    'filename': safe_filename,
-                    'company': entry.get('title', ''),
-                    'date': entry.get('published', ''),
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                # Save to retry queue
-                retry_file = "retry_downloads.json"
+            self.download_announcement_pdf(entry.get('title', ''), entry.get('published', ''), pdf_link)
+        
+        if self.verbose:
+            print("-" * 80)
+    
+    def download_pending_pdfs(self, entries, max_workers=3):
+        """Download PDFs for new entries in parallel (capped to avoid NSE rate limiting)"""
+        if not entries:
+            return
+        
+        print(f"📥 Downloading {len(entries)} PDFs ({max_workers} at a time)...")
+        successful = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.download_announcement_pdf, entry.get('title', ''), entry.get('pubDate', ''), entry['link']): entry
+                for entry in entries
+            }
+            for future in as_completed(futures):
+                try:
+                    if future.result():
+                        successful += 1
+                except Exception as e:
+                    print(f"❌ Download error for {futures[future].get('title', 'Unknown')}: {e}")
+        
+        print(f"📊 PDF downloads: {successful}/{len(entries)} successful")
+    
+    def download_announcement_pdf(self, company, published, pdf_link):
+        """Download an announcement PDF, queueing it for retry on failure"""
+        # Clean filename
+        company_name = (company or 'Unknown').replace(' ', '_').replace('/', '_').replace('\\', '_')
+        pub_date = published.replace('-', '').replace(' ', '_').replace(':', '').replace(',', '')
+        
+        # Create safe filename - a short link digest keeps two filings from the same
+        # company at the same timestamp from racing on one path
+        link_tag = xxhash.xxh32_hexdigest(pdf_link.encode())
+        safe_filename = f"{company_name}_{pub_date}_{link_tag}.pdf"
+        # Remove any remaining unsafe characters
+        safe_filename = "".join(c for c in safe_filename if c.isalnum() or c in '._-')
+        
+        print(f"🎯 New announcement detected - attempting smart PDF download...")
+        success = self.download_pdf_with_smart_fallback(pdf_link, safe_filename)
+        
+        if not success:
+            # Store failed download for retry later
+            failed_item = {
+                'url': pdf_link,
+                'filename': safe_filename,
+                'company': company,
+                'date': published,
+                'timestamp': datetime.now().isoformat()
+            }
+            
+            # Save to retry queue
+            retry_file = "retry_downloads.json"
+            with self._retry_lock:
                 retry_queue = []
                 if os.path.exists(retry_file):
                     try:
@@ -512,26 +729,28 @@ class IncrementalNSEMonitor:
                 retry_queue.append(failed_item)
                 with open(retry_file, 'w') as f:
                     json.dump(retry_queue, f, indent=2)
-                
-                print(f"💾 Added to retry queue: {safe_filename}")
+            
+            print(f"💾 Added to retry queue: {safe_filename}")
         
-        print("-" * 80)
+        return success
     
-    def print_announcement_from_dict(self, item_data, is_new=False):
+    def print_announcement_from_dict(self, item_data, is_new=False, download_pdf=False):
         """Print announcement from dictionary data"""
-        print(f"\n🆕 {'-'*70}")
-        print(f"🏢 COMPANY: {item_data.get('title', 'Unknown')}")
-        print(f"📅 DATE: {item_data.get('pubDate', 'No Date')}")
-        print(f"🔗 DOCUMENT: {item_data.get('link', 'No Link')}")
-        
-        description = item_data.get('description', '')
-        if '|SUBJECT:' in description:
-            main_desc, subject = description.split('|SUBJECT:', 1)
-            print(f"📋 DESCRIPTION: {main_desc.strip()}")
-            print(f"🏷️  SUBJECT: {subject.strip()}")
-        else:
-            print(f"📋 DESCRIPTION: {description}")
-        print("-" * 80)
+        pdf_link = item_data.get('link', '')
+        if self.verbose:
+            sys.stdout.write(self.format_announcement(
+                item_data.get('title', 'Unknown'),
+                item_data.get('pubDate', 'No Date'),
+                pdf_link or 'No Link',
+                item_data.get('description', '')
+            ))
+        
+        # Optional PDF download for new announcements
+        if download_pdf and is_new and pdf_link:
+            self.download_announcement_pdf(item_data.get('title', ''), item_data.get('pubDate', ''), pdf_link)
+        
+        if self.verbose:
+            print("-" * 80)
     
     def retry_failed_downloads(self):
         """Retry previously failed downloads"""
@@ -638,7 +857,7 @@ class IncrementalNSEMonitor:
             print("📁 PDFs will be saved to: ./nse_downloads/")
             print("📝 Download logs: download_log.txt, failed_downloads.txt")
         
-        print(f"⏱️  Check interval: {self.check_interval} seconds")
+        print(f"⏱️  Check interval: {self.check_interval} seconds (adapts to feed activity and market hours)")
         print("Press Ctrl+C to stop\n")
         
         # Show current stats
@@ -647,7 +866,9 @@ class IncrementalNSEMonitor:
         
         while True:
             try:
+                self.new_items_this_poll = 0
                 self.smart_incremental_check()
+                self.adapt_check_interval(self.new_items_this_poll)
                 print(f"💤 Sleeping for {self.check_interval} seconds...")
                 time.sleep(self.check_interval)
             except KeyboardInterrupt:
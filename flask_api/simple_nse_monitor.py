@@ -5,22 +5,93 @@ Works around NSE blocking Python requests
 """
 
 import subprocess
-import json
+import hashlib
+import io
+import orjson
 import os
+import shutil
+import sys
+import atexit
+import threading
 import time
+import xxhash
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
 import re
 
+# Characters allowed in saved PDF filenames, and the shape of a hashed item ID
+_SAFE_NAME_RE = re.compile(r'[^\w\-_.]')
+_ITEM_ID_RE = re.compile(r'[0-9a-f]{16}')
+_COMPANY_NAME_TABLE = str.maketrans({' ': '_', '/': '_'})
+_PUB_DATE_TABLE = str.maketrans({'-': None, ' ': '_', ':': None})
+
+# PDFs larger than this are dropped from the page cache once written
+LARGE_PDF_BYTES = 16 * 1024 * 1024
+
+# Resolved once per process rather than probing `curl --version` on every poll
+_CURL_PATH = shutil.which('curl')
+
+def _file_size(path):
+    """Size of path in bytes, or 0 if it doesn't exist - one stat instead of exists() + getsize()"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# Returned by fetch_rss when the server answers 304 - the feed hasn't changed
+NOT_MODIFIED = object()
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
 class SimpleNSECurlMonitor:
     def __init__(self, check_interval=300, download_pdfs=True):
         self.rss_url = "https://nsearchives.nseindia.com/content/RSS/Online_announcements.xml"
         self.check_interval = check_interval
         self.download_pdfs = download_pdfs
         self.cache_file = "nse_simple_cache.json"
+        # Bounded FIFO of seen IDs with a companion set for O(1) lookups
+        self.max_seen_items = 5000
+        self._seen_order = deque()
         self.seen_items = set()
+        self.etag = None  # HTTP validators from the last successful RSS fetch
+        self.last_modified = None
+        self._cache_dirty = False  # Set whenever there is state not yet written to cache_file
+        self._last_body_key = None  # (body hash, max_items) of the last parsed feed
+        self._last_items = []
         self.load_cache()
         
+        # Keep-alive session reused across polls and PDF downloads; curl is only a fallback.
+        # Retry mirrors curl's --retry 2 --retry-delay 3
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=8,  # One connection per concurrent PDF download
+            max_retries=Retry(total=2, backoff_factor=3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+        })
+        
+        # Download log stays open for the life of the monitor; flushed after each check
+        self._log_fp = open("download_log.txt", "a", buffering=64 * 1024)
+        self._log_lock = threading.Lock()
+        atexit.register(self._log_fp.close)
+        
         # Create downloads directory
         if download_pdfs:
             os.makedirs("nse_downloads", exist_ok=True)
@@ -29,46 +100,145 @@ class SimpleNSECurlMonitor:
         """Load seen items from cache"""
         try:
             if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    cache = json.load(f)
-                    self.seen_items = set(cache.get('seen_items', []))
+                with open(self.cache_file, 'rb') as f:
+                    cache = orjson.loads(f.read())
+                    for item_id in cache.get('seen_items', [])[-self.max_seen_items:]:
+                        # Older caches stored hex digests or the raw "title-pubDate" key
+                        if isinstance(item_id, str):
+                            if _ITEM_ID_RE.fullmatch(item_id):
+                                item_id = int(item_id, 16)
+                            else:
+                                item_id = self.hash_item_key(item_id)
+                        self.mark_seen(item_id)
+                    self.etag = cache.get('etag')
+                    self.last_modified = cache.get('last_modified')
+                self._cache_dirty = False
                 print(f"📂 Loaded {len(self.seen_items)} cached items")
         except Exception as e:
             print(f"❌ Cache load error: {e}")
     
     def save_cache(self):
-        """Save seen items to cache"""
+        """Save seen items to cache (no-op if nothing changed since the last write)"""
+        if not self._cache_dirty:
+            return
+        
         try:
             cache = {
-                'seen_items': list(self.seen_items),
-                'last_updated': datetime.now().isoformat()
+                'seen_items': list(self._seen_order),
+                'last_updated': datetime.now().isoformat(),
+                'etag': self.etag,
+                'last_modified': self.last_modified
             }
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache, f, indent=2)
+            # Write compactly to a temp file and swap it in so a crash can't truncate the cache
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(cache))
+            os.replace(tmp_file, self.cache_file)
+            self._cache_dirty = False
         except Exception as e:
             print(f"❌ Cache save error: {e}")
     
+    @staticmethod
+    def hash_item_key(key):
+        """Stable 64-bit int ID for an item key - a small int is about half the size of its hex string"""
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+    
+    @staticmethod
+    def item_id(title, pub_date):
+        """ID of a (title, pubDate) pair - same digest as hash_item_key(f"{title}-{pub_date}"),
+        but the parts are fed to the hash directly instead of being joined first"""
+        h = hashlib.blake2b(digest_size=8)
+        h.update(title.encode())
+        h.update(b'-')
+        h.update(pub_date.encode())
+        return int.from_bytes(h.digest(), 'big')
+    
+    def mark_seen(self, item_id):
+        """Record an item ID, returning True if it had not been seen before"""
+        if item_id in self.seen_items:
+            return False
+        
+        self._seen_order.append(item_id)
+        self.seen_items.add(item_id)
+        self._cache_dirty = True
+        if len(self._seen_order) > self.max_seen_items:
+            self.seen_items.discard(self._seen_order.popleft())
+        return True
+    
+    def log_download(self, line):
+        """Append a line to the shared download log (safe from download worker threads)"""
+        with self._log_lock:
+            self._log_fp.write(line)
+    
+    def _fetch_one(self, url, **kwargs):
+        """Single blocking GET on the shared session.
+        
+        The RSS poll is one small request per check, so it stays on this plain
+        synchronous path - a worker pool only pays off for the PDF fan-out
+        (see _fetch_many), and would just add setup cost here.
+        """
+        return self.session.get(url, **kwargs)
+    
+    def _fetch_many(self, pairs, max_workers=8):
+        """Download (url, filename) pairs on a worker pool; returns per-pair success flags"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda pair: self.download_pdf(*pair, curl_fallback=False), pairs))
+    
+    def fetch_rss(self):
+        """Fetch RSS over the shared session, falling back to curl if the request fails"""
+        print("📡 Fetching RSS...")
+        
+        # Conditional GET - a 304 costs no body transfer and no parse
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        
+        try:
+            response = self._fetch_one(self.rss_url, headers=headers, timeout=(30, 120))
+            if response.status_code == 304:
+                return NOT_MODIFIED
+            response.raise_for_status()
+            # Keep the raw bytes - libxml2 picks the encoding from the XML declaration,
+            # which requests' header-based .text guess can get wrong
+            content = response.content.strip()
+            print(f"✅ Fetched RSS! Content length: {len(content):,} bytes")
+            
+            # Basic validation
+            if b'<rss' in content and b'</rss>' in content:
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                if (etag, last_modified) != (self.etag, self.last_modified):
+                    self.etag, self.last_modified = etag, last_modified
+                    self._cache_dirty = True
+                return content
+            print("⚠️ Invalid RSS content received")
+            return None
+            
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Session fetch failed ({e}), falling back to curl")
+            return self.fetch_rss_with_curl()
+    
     def fetch_rss_with_curl(self):
         """Fetch RSS using curl - bypasses Python request blocking"""
         print("📡 Fetching RSS with curl...")
         
+        if not _CURL_PATH:
+            print("❌ Curl not found. Install with: sudo apt install curl")
+            return None
+        
         try:
-            # Check if curl is available
-            result = subprocess.run(['curl', '--version'], capture_output=True, text=True)
-            if result.returncode != 0:
-                print("❌ Curl not found. Install with: sudo apt install curl")
-                return None
-            
             # Curl command with browser-like headers
             curl_cmd = [
-                'curl',
+                _CURL_PATH,
                 '-s',  # Silent
                 '-L',  # Follow redirects
                 '--connect-timeout', '30',
                 '--max-time', '120',
                 '--retry', '2',
                 '--retry-delay', '3',
-                '--user-agent', 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                '--user-agent', USER_AGENT,
                 '--header', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 '--header', 'Accept-Language: en-US,en;q=0.9',
                 '--compressed',
@@ -76,20 +246,20 @@ class SimpleNSECurlMonitor:
             ]
             
             print("🔄 Running curl command...")
-            result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=150)
+            result = subprocess.run(curl_cmd, capture_output=True, timeout=150)
             
             if result.returncode == 0 and result.stdout.strip():
                 content = result.stdout.strip()
-                print(f"✅ Curl success! Content length: {len(content):,} chars")
+                print(f"✅ Curl success! Content length: {len(content):,} bytes")
                 
                 # Basic validation
-                if '<rss' in content and '</rss>' in content:
+                if b'<rss' in content and b'</rss>' in content:
                     return content
                 else:
                     print("⚠️ Invalid RSS content received")
                     return None
             else:
-                print(f"❌ Curl failed: {result.stderr}")
+                print(f"❌ Curl failed: {result.stderr.decode('utf-8', 'replace')}")
                 return None
                 
         except subprocess.TimeoutExpired:
@@ -102,40 +272,103 @@ class SimpleNSECurlMonitor:
             print(f"❌ Curl error: {e}")
             return None
     
-    def parse_rss_manually(self, xml_content):
-        """Parse RSS manually since feedparser might have issues"""
+    def parse_rss_stream(self, xml_content, max_items):
+        """Stream-parse RSS items, stopping once max_items have been collected"""
         try:
             print("🔄 Parsing RSS content...")
             
-            # Remove any encoding declarations that might cause issues
-            xml_content = re.sub(r'<\?xml[^>]*\?>', '', xml_content)
-            
-            # Parse with ElementTree
-            root = ET.fromstring(xml_content)
+            # libxml2 parses bytes directly and honours (or recovers from) the XML declaration
+            if isinstance(xml_content, str):
+                xml_content = xml_content.encode('utf-8')
             
-            # Find all item elements
             items = []
-            for item in root.findall('.//item'):
-                item_data = {}
-                
-                # Extract basic fields
-                for child in item:
-                    if child.tag in ['title', 'link', 'description', 'pubDate']:
-                        item_data[child.tag] = (child.text or '').strip()
+            for _, elem in etree.iterparse(io.BytesIO(xml_content), events=('end',), tag='item', recover=True):
+                item_data = {
+                    child.tag: (child.text or '').strip()
+                    for child in elem
+                    if child.tag in ('title', 'link', 'description', 'pubDate')
+                }
+                elem.clear()
                 
                 if item_data.get('title'):
                     items.append(item_data)
+                    if len(items) >= max_items:
+                        break
             
             print(f"📊 Parsed {len(items)} items from RSS")
             return items
             
-        except ET.ParseError as e:
+        except etree.XMLSyntaxError as e:
             print(f"❌ XML parse error: {e}")
             return []
         except Exception as e:
             print(f"❌ RSS parse error: {e}")
             return []
     
+    def download_pdf(self, pdf_url, filename, curl_fallback=True):
+        """Download PDF over the shared session, falling back to curl if the request fails"""
+        if not pdf_url.endswith('.pdf'):
+            return False
+        
+        filepath = os.path.join("nse_downloads", filename)
+        
+        # Skip if exists
+        if _file_size(filepath) > 0:
+            print(f"📄 Already exists: {filename}")
+            return True
+        
+        print(f"📥 Downloading: {filename}")
+        
+        # Stream into a temp file and rename it into place only once it's complete,
+        # so an interrupted transfer never leaves a truncated PDF behind the exists check
+        partpath = filepath + '.part'
+        try:
+            response = self._fetch_one(pdf_url, stream=True, timeout=(30, 300))
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(partpath, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+                self._release_page_cache(f)
+            
+            file_size = _file_size(partpath)
+            expected = response.headers.get('Content-Length')
+            if expected and not response.headers.get('Content-Encoding') and int(expected) != file_size:
+                raise IOError(f"short read: got {file_size} of {expected} bytes")
+            if file_size > 0:
+                os.replace(partpath, filepath)
+                print(f"✅ Downloaded: {filename} ({file_size:,} bytes)")
+                
+                # Log success
+                self.log_download(f"{datetime.now()}: {filename} - {file_size} bytes\n")
+                
+                return True
+            _remove_if_exists(partpath)  # Remove empty file
+            print(f"❌ Download failed: {filename}")
+            return False
+            
+        # Reading response.raw directly skips requests' exception wrapping, so
+        # urllib3 errors (ProtocolError, ReadTimeoutError) surface as-is
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError, ValueError) as e:
+            _remove_if_exists(partpath)
+            if not curl_fallback:
+                print(f"⚠️ Session download failed for {filename}: {e}")
+                return False
+            print(f"⚠️ Session download failed ({e}), falling back to curl")
+            return self.download_pdf_with_curl(pdf_url, filename)
+    
+    @staticmethod
+    def _release_page_cache(f):
+        """Keep large, write-once PDFs from evicting hotter pages (Linux only, best effort)"""
+        if not hasattr(os, 'posix_fadvise') or f.tell() < LARGE_PDF_BYTES:
+            return
+        try:
+            # DONTNEED only drops clean pages, so push the data to disk first
+            f.flush()
+            os.fdatasync(f.fileno())
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+    
     def download_pdf_with_curl(self, pdf_url, filename):
         """Download PDF using curl"""
         if not pdf_url.endswith('.pdf'):
@@ -144,15 +377,19 @@ class SimpleNSECurlMonitor:
         filepath = os.path.join("nse_downloads", filename)
         
         # Skip if exists
-        if os.path.exists(filepath):
+        if _file_size(filepath) > 0:
             print(f"📄 Already exists: {filename}")
             return True
         
+        if not _CURL_PATH:
+            print("❌ Curl not found. Install with: sudo apt install curl")
+            return False
+        
         print(f"📥 Downloading: {filename}")
         
         try:
             curl_cmd = [
-                'curl',
+                _CURL_PATH,
                 '-L',  # Follow redirects
                 '-o', filepath,
                 '--connect-timeout', '30',
@@ -165,26 +402,24 @@ class SimpleNSECurlMonitor:
             
             result = subprocess.run(curl_cmd, timeout=360)
             
-            if result.returncode == 0 and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
+            if result.returncode == 0:
+                file_size = _file_size(filepath)
                 if file_size > 0:
                     print(f"✅ Downloaded: {filename} ({file_size:,} bytes)")
                     
                     # Log success
-                    with open("download_log.txt", "a") as log:
-                        log.write(f"{datetime.now()}: {filename} - {file_size} bytes\n")
+                    self.log_download(f"{datetime.now()}: {filename} - {file_size} bytes\n")
                     
                     return True
                 else:
-                    os.remove(filepath)  # Remove empty file
+                    _remove_if_exists(filepath)  # Remove empty file
             
             print(f"❌ Download failed: {filename}")
             return False
             
         except subprocess.TimeoutExpired:
             print(f"⏰ Download timed out: {filename}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            _remove_if_exists(filepath)
             return False
         except Exception as e:
             print(f"❌ Download error: {e}")
@@ -192,79 +427,169 @@ class SimpleNSECurlMonitor:
     
     def process_announcement(self, item, is_new=False):
         """Process a single announcement"""
-        print(f"\n{'🆕' if is_new else '👁️'} {'-'*70}")
-        print(f"🏢 COMPANY: {item.get('title', 'Unknown')}")
-        print(f"📅 DATE: {item.get('pubDate', 'No Date')}")
-        
         pdf_link = item.get('link', '')
-        print(f"🔗 DOCUMENT: {pdf_link}")
+        lines = [
+            f"\n{'🆕' if is_new else '👁️'} {'-'*70}",
+            f"🏢 COMPANY: {item.get('title', 'Unknown')}",
+            f"📅 DATE: {item.get('pubDate', 'No Date')}",
+            f"🔗 DOCUMENT: {pdf_link}",
+        ]
         
         # Parse description
         description = item.get('description', '')
         if '|SUBJECT:' in description:
             main_desc, subject = description.split('|SUBJECT:', 1)
-            print(f"📋 DESCRIPTION: {main_desc.strip()}")
-            print(f"🏷️ SUBJECT: {subject.strip()}")
+            lines.append(f"📋 DESCRIPTION: {main_desc.strip()}")
+            lines.append(f"🏷️ SUBJECT: {subject.strip()}")
         else:
-            print(f"📋 DESCRIPTION: {description}")
+            lines.append(f"📋 DESCRIPTION: {description}")
+        lines.append("-" * 80)
         
-        # Download PDF if requested and new
+        # One write per announcement instead of one per line; flushed at the end of the check
+        sys.stdout.write("\n".join(lines) + "\n")
+        
+        # Return the PDF to download if requested and new; downloads run together afterwards
         if self.download_pdfs and is_new and pdf_link.endswith('.pdf'):
-            # Create safe filename
-            company = item.get('title', 'Unknown').replace(' ', '_').replace('/', '_')
-            pub_date = item.get('pubDate', '').replace('-', '').replace(' ', '_').replace(':', '')
-            filename = f"{company}_{pub_date}.pdf"
-            
-            # Clean filename
-            filename = re.sub(r'[^\w\-_.]', '', filename)
+            # Create safe filename - one translate per part, one regex pass for the rest
+            company = item.get('title', 'Unknown').translate(_COMPANY_NAME_TABLE)
+            pub_date = item.get('pubDate', '').translate(_PUB_DATE_TABLE)
+            filename = _SAFE_NAME_RE.sub('', f"{company}_{pub_date}.pdf")
             
-            self.download_pdf_with_curl(pdf_link, filename)
+            return pdf_link, filename
+        return None
+    
+    def download_pdfs_concurrently(self, pairs, max_workers=8):
+        """Download (url, filename) pairs in parallel - each download is network-bound"""
+        if not pairs:
+            return
+        
+        print(f"📥 Downloading {len(pairs)} PDFs ({max_workers} at a time)...")
+        results = self._fetch_many(pairs, max_workers=max_workers)
+        
+        # Anything the session couldn't fetch goes to curl in a single batched run
+        failed = [pair for pair, ok in zip(pairs, results) if not ok]
+        successful = len(pairs) - len(failed)
+        if failed:
+            successful += self.download_pdfs_batch(failed, max_parallel=max_workers)
+        print(f"📊 PDF downloads: {successful}/{len(pairs)} successful")
+    
+    def download_pdfs_batch(self, pairs, max_parallel=8):
+        """Download (url, filename) pairs with one parallel curl process; returns the success count"""
+        pairs = [(url, filename) for url, filename in pairs if url.endswith('.pdf')]
+        if not pairs:
+            return 0
+        if not _CURL_PATH:
+            print("❌ Curl not found. Install with: sudo apt install curl")
+            return 0
+        
+        print(f"🔄 Retrying {len(pairs)} PDFs with curl --parallel...")
+        curl_cmd = [
+            _CURL_PATH,
+            '--parallel',
+            '--parallel-max', str(max_parallel),
+            '-L',  # Follow redirects
+            '--connect-timeout', '30',
+            '--max-time', '300',  # 5 minutes for large PDFs
+            '--retry', '2',
+            '--fail',  # HTTP errors count as failed transfers instead of saving the error page
+            '--user-agent', USER_AGENT,
+            '--silent',
+            # One result line per transfer - the process exit code only reflects the last failure
+            '--write-out', '%{filename_effective}\t%{exitcode}\t%{http_code}\n',
+        ]
+        for url, filename in pairs:
+            curl_cmd += ['-o', os.path.join("nse_downloads", filename), url]
+        
+        try:
+            output = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=360).stdout
+        except subprocess.TimeoutExpired as e:
+            print("⏰ Batched curl download timed out")
+            # Transfers that reported before the kill are still trustworthy
+            output = e.stdout.decode('utf-8', 'replace') if isinstance(e.stdout, bytes) else (e.stdout or '')
+        except FileNotFoundError:
+            print("❌ Curl not found. Install with: sudo apt install curl")
+            return 0
         
-        print("-" * 80)
+        results = {}
+        for line in output.splitlines():
+            parts = line.rsplit('\t', 2)
+            if len(parts) == 3:
+                results[parts[0]] = parts[1:]
+        
+        successful = 0
+        for url, filename in pairs:
+            filepath = os.path.join("nse_downloads", filename)
+            exit_code, http_code = results.get(filepath, ('', ''))
+            file_size = _file_size(filepath)
+            if exit_code == '0' and file_size > 0:
+                print(f"✅ Downloaded: {filename} ({file_size:,} bytes)")
+                self.log_download(f"{datetime.now()}: {filename} - {file_size} bytes\n")
+                successful += 1
+            else:
+                detail = f"curl exit {exit_code}, HTTP {http_code}" if exit_code else "no result"
+                print(f"❌ Download failed: {filename} ({detail})")
+                _remove_if_exists(filepath)  # Remove empty/partial file
+        return successful
     
     def check_announcements(self, max_items=20):
         """Check for new announcements"""
         print(f"\n🔍 Checking NSE announcements at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Fetch RSS with curl
-        rss_content = self.fetch_rss_with_curl()
+        # Fetch RSS (session first, curl fallback)
+        rss_content = self.fetch_rss()
+        if rss_content is NOT_MODIFIED:
+            print("📭 304 Not Modified - no new announcements")
+            return
         if not rss_content:
             print("❌ Could not fetch RSS content")
             return
         
-        # Parse RSS
-        items = self.parse_rss_manually(rss_content)
-        if not items:
+        # Byte-identical feeds are common between polls - reuse the last parse if so
+        body_key = (xxhash.xxh3_64_intdigest(rss_content), max_items)
+        if body_key == self._last_body_key:
+            print("♻️ Feed body unchanged, reusing parsed items")
+            latest_items = self._last_items
+        else:
+            # Parse only the latest items - the rest of the feed is never touched
+            latest_items = self.parse_rss_stream(rss_content, max_items)
+            self._last_body_key, self._last_items = body_key, latest_items
+        if not latest_items:
             print("❌ Could not parse any items from RSS")
             return
         
-        print(f"📈 Total items in RSS: {len(items)}")
-        print(f"🎯 Processing latest {min(max_items, len(items))} items")
+        print(f"🎯 Processing latest {len(latest_items)} items")
         
-        # Process latest items only
-        latest_items = items[:max_items]
         new_count = 0
+        pending_downloads = []
         
         for item in latest_items:
             # Create unique ID
-            item_id = f"{item.get('title', '')}-{item.get('pubDate', '')}"
+            item_id = self.item_id(item.get('title', ''), item.get('pubDate', ''))
             
-            if item_id not in self.seen_items:
-                self.seen_items.add(item_id)
+            if self.mark_seen(item_id):
                 new_count += 1
-                self.process_announcement(item, is_new=True)
+                download = self.process_announcement(item, is_new=True)
+                if download:
+                    pending_downloads.append(download)
             else:
                 # Uncomment below to show all items, not just new ones
                 # self.process_announcement(item, is_new=False)
                 pass
         
+        sys.stdout.flush()
+        self.download_pdfs_concurrently(pending_downloads)
+        with self._log_lock:
+            self._log_fp.flush()
+        
         print(f"\n📊 SUMMARY: {new_count} new announcements, {len(latest_items) - new_count} previously seen")
         
         if new_count > 0:
             print(f"🔔 {new_count} NEW CORPORATE ANNOUNCEMENTS!")
-            self.save_cache()
         else:
             print("😴 No new announcements")
+        
+        # Once per check; skipped when neither seen items nor validators changed
+        self.save_cache()
     
     def run_monitoring(self):
         """Run continuous monitoring"""
@@ -274,11 +599,21 @@ class SimpleNSECurlMonitor:
         print(f"⏱️ Check interval: {self.check_interval} seconds")
         print("Press Ctrl+C to stop\n")
         
+        # Polls run on a fixed monotonic schedule, so a slow check doesn't push back every later one
+        next_deadline = time.monotonic()
         while True:
             try:
                 self.check_announcements()
-                print(f"💤 Sleeping for {self.check_interval} seconds...")
-                time.sleep(self.check_interval)
+                
+                next_deadline += self.check_interval
+                now = time.monotonic()
+                if next_deadline < now:
+                    # Overran one or more slots - skip them rather than polling back-to-back
+                    missed = int((now - next_deadline) // self.check_interval) + 1
+                    next_deadline += missed * self.check_interval
+                delay = next_deadline - now
+                print(f"💤 Sleeping for {delay:.0f} seconds...")
+                time.sleep(delay)
             except KeyboardInterrupt:
                 print("\n👋 Monitor stopped")
                 break
@@ -286,6 +621,7 @@ class SimpleNSECurlMonitor:
                 print(f"❌ Error: {e}")
                 print("🔄 Retrying in 60 seconds...")
                 time.sleep(60)
+                next_deadline = time.monotonic()
 
 def main():
     print("🧪 NSE RSS Monitor - Simple Curl Version")
@@ -5,51 +5,239 @@ Combines curl-based RSS fetching with smart PDF/XML downloads
 """
 
 import subprocess
+import hashlib
+import io
 import json
 import os
+import shutil
+import signal
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import deque
+try:
+    # libxml2-backed iterparse can filter on <item> itself
+    from lxml import etree as ET
+    _ITEM_ITERPARSE_KW = {'tag': 'item'}
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _ITEM_ITERPARSE_KW = {}
 import re
 
+# Filename cleanup patterns used by create_safe_filename
+_RE_NON_ALNUM_SPACE = re.compile(r'[^a-zA-Z0-9\s]')
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_NON_ALNUM_US = re.compile(r'[^a-zA-Z0-9_]')
+_RE_MULTI_US = re.compile(r'_{2,}')
+_RE_TRIM_US = re.compile(r'^_+|_+$')
+
+# Returned by fetch_items when the server answers 304 - the feed hasn't changed
+NOT_MODIFIED = object()
+
+# Attachment types the monitor downloads
+SUPPORTED_EXTENSIONS = ('.pdf', '.xml')
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+def _url_extension(url):
+    """Lower-cased extension of a URL's path, ignoring any query string"""
+    return os.path.splitext(urlsplit(url).path)[1].lower()
+
+def _file_size(path):
+    """Size of path in bytes, 0 if it doesn't exist"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 class CompleteNSEMonitor:
-    def __init__(self, check_interval=300, max_items=20, download_pdfs=True):
+    def __init__(self, check_interval=300, max_items=20, download_pdfs=True, subprocess_fallback=False):
         self.rss_url = "https://nsearchives.nseindia.com/content/RSS/Online_announcements.xml"
         self.check_interval = check_interval
         self.max_items = max_items
         self.download_pdfs = download_pdfs
-        self.cache_file = "nse_complete_cache.json"
+        self.cache_file = "nse_complete_cache.json"  # Feed metadata (validators, last update)
+        self.seen_file = "nse_complete_seen.txt"  # One item digest per line
+        # Bounded FIFO of seen digests with a mirror set for O(1) lookups
+        self.max_seen_items = 10000
+        self._seen_order = deque()
         self.seen_items = set()
+        self.etag = None  # HTTP validators from the last successful RSS fetch
+        self.last_modified = None
+        self.subprocess_fallback = subprocess_fallback  # Fall back to curl/wget when requests fails
+        self.max_download_workers = 8  # Kept <= the adapter's pool_maxsize
+        self._log_lock = threading.Lock()  # Download workers share the log files
+        # Download method order: the last method that worked goes first for the rest of a poll
+        self._last_method_success = 'requests'
+        # Circuit breaker: two connection errors in a row park requests for circuit_cooldown seconds
+        # (downloads switch to curl/wget if enabled, otherwise wait the cooldown out)
+        self.circuit_cooldown = 60
+        self._circuit_open_until = 0.0
+        self._requests_conn_failures = 0
+        self._method_lock = threading.Lock()
+        self._downloaded = set()  # Names in nse_downloads, snapshotted once per poll
+        # Log files stay open between downloads; flushed once per check
+        self.download_log = open("download_log.txt", "a", buffering=8192)
+        self.failed_log = open("failed_downloads.txt", "a", buffering=8192)
         self.load_cache()
         
+        # One pooled keep-alive session for the RSS poll and every file download
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9'
+        })
+        
         # Create downloads directory
         if download_pdfs:
             os.makedirs("nse_downloads", exist_ok=True)
+            self.refresh_downloaded()
     
     def load_cache(self):
-        """Load seen items from cache"""
+        """Load seen item digests and feed metadata from cache"""
         try:
+            legacy_keys = []
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r') as f:
                     cache = json.load(f)
-                    self.seen_items = set(cache.get('seen_items', []))
-                print(f"📂 Loaded {len(self.seen_items)} cached items")
+                    # Older caches kept raw "title-pubDate" keys in the JSON
+                    legacy_keys = cache.get('seen_items', [])
+                    self.etag = cache.get('etag')
+                    self.last_modified = cache.get('last_modified')
+            
+            for key in legacy_keys:
+                self.mark_seen(self.hash_item_key(key))
+            if os.path.exists(self.seen_file):
+                with open(self.seen_file, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            self.mark_seen(line.strip())
+            
+            print(f"📂 Loaded {len(self.seen_items)} cached items")
         except Exception as e:
             print(f"❌ Cache load error: {e}")
     
     def save_cache(self):
-        """Save seen items to cache"""
+        """Save seen item digests and feed metadata to cache"""
         try:
+            with open(self.seen_file, 'w') as f:
+                f.write('\n'.join(self._seen_order))
+            
             cache = {
-                'seen_items': list(self.seen_items),
-                'last_updated': datetime.now().isoformat()
+                'last_updated': datetime.now().isoformat(),
+                'etag': self.etag,
+                'last_modified': self.last_modified
             }
             with open(self.cache_file, 'w') as f:
                 json.dump(cache, f, indent=2)
         except Exception as e:
             print(f"❌ Cache save error: {e}")
     
+    def write_log(self, log, line):
+        """Append a line to one of the shared log files"""
+        with self._log_lock:
+            log.write(line)
+    
+    def flush_logs(self):
+        """Push buffered log lines to disk"""
+        with self._log_lock:
+            self.download_log.flush()
+            self.failed_log.flush()
+    
+    def close_logs(self):
+        """Flush and close the log files on shutdown"""
+        with self._log_lock:
+            self.download_log.close()
+            self.failed_log.close()
+    
+    @staticmethod
+    def hash_item_key(key):
+        """Fixed-width digest of an item key - much shorter than the link it is built from"""
+        return hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+    
+    @staticmethod
+    def item_key(item):
+        """Dedup key for an item - its attachment link, which is unique per announcement"""
+        return item.get('link') or f"{item.get('title', '')}-{item.get('pubDate', '')}"
+    
+    def mark_new_item(self, item):
+        """Mark an item seen, returning True if it had not been seen before"""
+        if not self.mark_seen(self.hash_item_key(self.item_key(item))):
+            return False
+        # Digests saved before items were keyed by link used "title-pubDate"
+        legacy_id = self.hash_item_key(f"{item.get('title', '')}-{item.get('pubDate', '')}")
+        return legacy_id not in self.seen_items
+    
+    def mark_seen(self, item_id):
+        """Record an item digest, returning True if it had not been seen before"""
+        if item_id in self.seen_items:
+            return False
+        
+        self._seen_order.append(item_id)
+        self.seen_items.add(item_id)
+        if len(self._seen_order) > self.max_seen_items:
+            self.seen_items.discard(self._seen_order.popleft())
+        return True
+    
+    def fetch_items(self, max_items=None, conditional=True):
+        """Fetch the RSS and parse it as it streams in, stopping after max_items (all if None).
+        
+        Falls back to curl only if the request raises. Returns the parsed items, None if the
+        feed couldn't be fetched, or NOT_MODIFIED (with conditional=True) if it is unchanged.
+        """
+        print("📡 Fetching RSS...")
+        
+        headers = {}
+        if conditional:
+            if self.etag:
+                headers['If-None-Match'] = self.etag
+            if self.last_modified:
+                headers['If-Modified-Since'] = self.last_modified
+        
+        try:
+            response = self.session.get(self.rss_url, headers=headers, timeout=(10, 60), stream=True)
+            # Closing early drops the rest of the body once max_items are parsed
+            with response:
+                if response.status_code == 304:
+                    return NOT_MODIFIED
+                response.raise_for_status()
+                
+                # The parser reads straight off the socket, so parsing overlaps the download
+                response.raw.decode_content = True
+                items = self.parse_rss_manually(response.raw, max_items=max_items)
+            
+            # Only trust the validators of a feed that parsed
+            if items:
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+            return items
+                
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Session fetch failed ({e}), falling back to curl")
+            content = self.fetch_rss_with_curl()
+            if not content:
+                return None
+            return self.parse_rss_manually(content, max_items=max_items)
+    
     def fetch_rss_with_curl(self):
         """Fetch RSS using curl - bypasses Python request blocking"""
         print("📡 Fetching RSS with curl...")
@@ -63,26 +251,26 @@ class CompleteNSEMonitor:
                 '--max-time', '120',
                 '--retry', '2',
                 '--retry-delay', '3',
-                '--user-agent', 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                '--user-agent', USER_AGENT,
                 '--header', 'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 '--header', 'Accept-Language: en-US,en;q=0.9',
                 '--compressed',
                 self.rss_url
             ]
             
-            result = subprocess.run(curl_cmd, capture_output=True, text=True, timeout=150)
+            result = subprocess.run(curl_cmd, capture_output=True, timeout=150)
             
             if result.returncode == 0 and result.stdout.strip():
                 content = result.stdout.strip()
-                print(f"✅ RSS fetched! Content length: {len(content):,} chars")
+                print(f"✅ RSS fetched! Content length: {len(content):,} bytes")
                 
-                if '<rss' in content and '</rss>' in content:
+                if b'<rss' in content and b'</rss>' in content:
                     return content
                 else:
                     print("⚠️ Invalid RSS content received")
                     return None
             else:
-                print(f"❌ Curl failed: {result.stderr}")
+                print(f"❌ Curl failed: {result.stderr.decode('utf-8', 'replace')}")
                 return None
                 
         except subprocess.TimeoutExpired:
@@ -92,29 +280,30 @@ class CompleteNSEMonitor:
             print(f"❌ Curl error: {e}")
             return None
     
-    def parse_rss_manually(self, xml_content):
-        """Parse RSS manually"""
+    def parse_rss_manually(self, xml_content, max_items=None):
+        """Stream-parse RSS bytes or a binary stream, stopping after max_items (all items if None)"""
         try:
             print("🔄 Parsing RSS content...")
             
-            # Remove encoding declarations
-            xml_content = re.sub(r'<\?xml[^>]*\?>', '', xml_content)
-            
-            # Parse with ElementTree
-            root = ET.fromstring(xml_content)
-            
-            # Find all item elements
+            # iterparse reads the XML declaration itself and frees each item once read
             items = []
-            for item in root.findall('.//item'):
-                item_data = {}
+            source = io.BytesIO(xml_content) if isinstance(xml_content, bytes) else xml_content
+            events = ET.iterparse(source, events=('end',), **_ITEM_ITERPARSE_KW)
+            for _, elem in events:
+                if elem.tag != 'item':  # Only needed for the stdlib fallback
+                    continue
                 
-                # Extract basic fields
-                for child in item:
-                    if child.tag in ['title', 'link', 'description', 'pubDate']:
-                        item_data[child.tag] = (child.text or '').strip()
+                item_data = {
+                    child.tag: (child.text or '').strip()
+                    for child in elem
+                    if child.tag in ('title', 'link', 'description', 'pubDate')
+                }
+                elem.clear()
                 
                 if item_data.get('title'):
                     items.append(item_data)
+                    if max_items is not None and len(items) >= max_items:
+                        break
             
             print(f"📊 Parsed {len(items)} items from RSS")
             return items
@@ -126,46 +315,45 @@ class CompleteNSEMonitor:
             print(f"❌ RSS parse error: {e}")
             return []
     
-    def create_safe_filename(self, company, pub_date, file_url):
+    def create_safe_filename(self, company, pub_date, file_url, ext=None):
         """Create a safe filename from company name and date"""
+        if ext is None:
+            ext = _url_extension(file_url)
+        file_ext = ext if ext in SUPPORTED_EXTENSIONS else '.pdf'  # Default fallback
+        # Dedup is per link, so two filings from one company at the same timestamp are
+        # both new - a short link digest keeps them from writing the same path
+        link_tag = hashlib.blake2b((file_url or '').encode(), digest_size=4).hexdigest()
+        
         try:
             # Clean company name - keep only alphanumeric and spaces
-            company_clean = re.sub(r'[^a-zA-Z0-9\s]', '', company)
-            company_clean = re.sub(r'\s+', '_', company_clean.strip())
+            company_clean = _RE_NON_ALNUM_SPACE.sub('', company)
+            company_clean = _RE_WHITESPACE.sub('_', company_clean.strip())
             
             # Clean date - format: "09-Aug-2025 20:27:19" -> "09Aug2025_202719"
             if pub_date:
                 # Extract just the date and time parts
                 date_parts = pub_date.replace('-', '').replace(':', '').replace(' ', '_')
                 # Remove any remaining non-alphanumeric except underscore
-                date_clean = re.sub(r'[^a-zA-Z0-9_]', '', date_parts)
+                date_clean = _RE_NON_ALNUM_US.sub('', date_parts)
             else:
                 date_clean = datetime.now().strftime('%d%b%Y_%H%M%S')
             
-            # Determine file extension
-            if file_url.endswith('.pdf'):
-                file_ext = '.pdf'
-            elif file_url.endswith('.xml'):
-                file_ext = '.xml'
-            else:
-                file_ext = '.pdf'  # Default fallback
-            
             # Combine parts
-            filename = f"{company_clean}_{date_clean}{file_ext}"
+            filename = f"{company_clean}_{date_clean}_{link_tag}{file_ext}"
             
             # Final cleanup
-            filename = re.sub(r'_{2,}', '_', filename)  # Remove multiple underscores
-            filename = re.sub(r'^_+|_+$', '', filename)  # Remove leading/trailing underscores
+            filename = _RE_MULTI_US.sub('_', filename)  # Remove multiple underscores
+            filename = _RE_TRIM_US.sub('', filename)  # Remove leading/trailing underscores
             
             # Ensure we have a valid filename
             if not filename or filename == file_ext or len(filename) < 5:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"NSE_Announcement_{timestamp}{file_ext}"
+                filename = f"NSE_Announcement_{timestamp}_{link_tag}{file_ext}"
             
-            # Limit filename length (filesystem limits)
+            # Limit filename length (filesystem limits), keeping the link digest
             if len(filename) > 200:
-                base_name = filename[:190]
-                filename = base_name + file_ext
+                base_name = filename[:181]
+                filename = f"{base_name}_{link_tag}{file_ext}"
             
             return filename
             
@@ -173,80 +361,118 @@ class CompleteNSEMonitor:
             print(f"❌ Error creating filename: {e}")
             # Fallback filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            ext = '.pdf' if file_url.endswith('.pdf') else '.xml' if file_url.endswith('.xml') else '.pdf'
-            return f"NSE_Announcement_{timestamp}{ext}"
+            return f"NSE_Announcement_{timestamp}_{link_tag}{file_ext}"
     
-    def smart_download_file(self, file_url, filename):
+    def smart_download_file(self, file_url, filename, ext=None):
         """Smart file download for both PDF and XML files"""
-        if not (file_url.endswith('.pdf') or file_url.endswith('.xml')):
+        if ext is None:
+            ext = _url_extension(file_url)
+        if ext not in SUPPORTED_EXTENSIONS:
             print(f"⚠️ Skipping unsupported file type: {file_url}")
             return False
         
         filepath = os.path.join("nse_downloads", filename)
         
-        # Skip if exists
-        if os.path.exists(filepath):
+        # Skip if exists - checked against the per-poll snapshot; the download methods trust it
+        if filename in self._downloaded:
             print(f"📄 Already exists: {filename}")
             return True
         
         print(f"📥 Smart downloading: {filename}")
         
-        # Method 1: Try requests first
-        success = self._download_with_requests(file_url, filepath, filename)
-        if success:
-            return True
-        
-        # Method 2: Try curl
-        success = self._download_with_curl(file_url, filepath, filename)
-        if success:
-            return True
-        
-        # Method 3: Try wget
-        success = self._download_with_wget(file_url, filepath, filename)
-        if success:
-            return True
+        for method in self._download_order():
+            if self._download_methods[method](self, file_url, filepath, filename):
+                with self._method_lock:
+                    self._last_method_success = method
+                self._downloaded.add(filename)
+                return True
         
         print(f"❌ All download methods failed: {filename}")
         
         # Log failed download
-        with open("failed_downloads.txt", "a") as log:
-            log.write(f"{datetime.now()}: FAILED - {file_url} -> {filename}\\n")
+        self.write_log(self.failed_log, f"{datetime.now()}: FAILED - {file_url} -> {filename}\\n")
         
         return False
     
+    def _download_order(self):
+        """Download methods to try, last successful first.
+        
+        While the requests circuit is open, requests is skipped if there is a fallback,
+        and otherwise the caller backs off until the cooldown ends.
+        """
+        # Subprocess fallbacks pay fork/exec and a fresh TLS handshake, so they're opt-in
+        methods = ['requests', 'curl', 'wget'] if self.subprocess_fallback else ['requests']
+        with self._method_lock:
+            preferred = self._last_method_success
+            open_until = self._circuit_open_until
+        if preferred in methods:
+            methods.remove(preferred)
+            methods.insert(0, preferred)
+        remaining = open_until - time.monotonic()
+        if remaining > 0:
+            if len(methods) > 1:
+                methods.remove('requests')
+            else:
+                # Nothing to route around it with, so wait out the cooldown instead of
+                # piling more connection attempts onto a host that keeps refusing them
+                time.sleep(remaining)
+        return methods
+    
+    def _record_requests_result(self, connection_error):
+        """Update the requests circuit breaker after a download attempt"""
+        with self._method_lock:
+            if not connection_error:
+                self._requests_conn_failures = 0
+                self._circuit_open_until = 0.0
+                return
+            self._requests_conn_failures += 1
+            if self._requests_conn_failures >= 2:
+                self._circuit_open_until = time.monotonic() + self.circuit_cooldown
+                action = "using fallbacks" if self.subprocess_fallback else "backing off"
+                print(f"⚡ Requests unreachable, {action} for {self.circuit_cooldown}s")
+    
     def _download_with_requests(self, file_url, filepath, filename):
         """Method 1: Enhanced requests for any file type"""
         try:
             print("🔄 Trying requests method...")
             
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/pdf,application/xml,text/xml,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9'
-            })
-            
-            response = session.get(file_url, timeout=(30, 300), stream=True)
+            response = self.session.get(
+                file_url,
+                headers={
+                    'Accept': 'application/pdf,application/xml,text/xml,*/*;q=0.8',
+                    # PDFs barely compress - ask for the bytes as-is so no decoder sits in the copy
+                    'Accept-Encoding': 'identity'
+                },
+                timeout=(30, 300),
+                stream=True
+            )
             response.raise_for_status()
             
+            # Still decode if the server compresses anyway, then copy in 64 KiB blocks
+            response.raw.decode_content = True
             with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+                shutil.copyfileobj(response.raw, f, length=65536)
+                file_size = f.tell()
+            
+            # Older urllib3 doesn't enforce Content-Length, so catch truncated bodies here
+            expected = response.headers.get('Content-Length')
+            if expected and 'Content-Encoding' not in response.headers and file_size != int(expected):
+                raise IOError(f"incomplete download: {file_size:,} of {int(expected):,} bytes")
             
-            file_size = os.path.getsize(filepath)
             print(f"✅ Requests success: {filename} ({file_size:,} bytes)")
             
             # Log success
-            with open("download_log.txt", "a") as log:
-                log.write(f"{datetime.now()}: {filename} - {file_size} bytes - requests\\n")
+            self.write_log(self.download_log, f"{datetime.now()}: {filename} - {file_size} bytes - requests\\n")
+            self._record_requests_result(connection_error=False)
             
             return True
             
         except Exception as e:
             print(f"❌ Requests failed: {e}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            self._record_requests_result(
+                connection_error=isinstance(e, (requests.ConnectionError, requests.Timeout))
+            )
+            _remove_if_exists(filepath)
             return False
     
     def _download_with_curl(self, file_url, filepath, filename):
@@ -268,25 +494,23 @@ class CompleteNSEMonitor:
             
             result = subprocess.run(curl_cmd, timeout=360)
             
-            if result.returncode == 0 and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
+            if result.returncode == 0:
+                file_size = _file_size(filepath)
                 if file_size > 0:
                     print(f"✅ Curl success: {filename} ({file_size:,} bytes)")
                     
                     # Log success
-                    with open("download_log.txt", "a") as log:
-                        log.write(f"{datetime.now()}: {filename} - {file_size} bytes - curl\\n")
+                    self.write_log(self.download_log, f"{datetime.now()}: {filename} - {file_size} bytes - curl\\n")
                     
                     return True
-                else:
-                    os.remove(filepath)
             
+            # Drop partial or empty output
+            _remove_if_exists(filepath)
             return False
             
         except Exception as e:
             print(f"❌ Curl failed: {e}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            _remove_if_exists(filepath)
             return False
     
     def _download_with_wget(self, file_url, filepath, filename):
@@ -306,27 +530,31 @@ class CompleteNSEMonitor:
             
             result = subprocess.run(wget_cmd, timeout=360)
             
-            if result.returncode == 0 and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
+            if result.returncode == 0:
+                file_size = _file_size(filepath)
                 if file_size > 0:
                     print(f"✅ Wget success: {filename} ({file_size:,} bytes)")
                     
                     # Log success
-                    with open("download_log.txt", "a") as log:
-                        log.write(f"{datetime.now()}: {filename} - {file_size} bytes - wget\\n")
+                    self.write_log(self.download_log, f"{datetime.now()}: {filename} - {file_size} bytes - wget\\n")
                     
                     return True
-                else:
-                    os.remove(filepath)
             
+            # Drop partial or empty output
+            _remove_if_exists(filepath)
             return False
             
         except Exception as e:
             print(f"❌ Wget failed: {e}")
-            if os.path.exists(filepath):
-                os.remove(filepath)
+            _remove_if_exists(filepath)
             return False
     
+    _download_methods = {
+        'requests': _download_with_requests,
+        'curl': _download_with_curl,
+        'wget': _download_with_wget,
+    }
+    
     def process_announcement(self, item, is_new=False):
         """Process a single announcement"""
         print(f"\\n{'🆕' if is_new else '👁️'} {'-'*70}")
@@ -347,66 +575,112 @@ class CompleteNSEMonitor:
         
         # Download files if requested and new (both PDF and XML)
         if self.download_pdfs and is_new:
-            if file_link.endswith('.pdf') or file_link.endswith('.xml'):
+            ext = _url_extension(file_link)
+            if ext in SUPPORTED_EXTENSIONS:
                 # Create safe filename using the new method
                 filename = self.create_safe_filename(
                     item.get('title', 'Unknown'),
                     item.get('pubDate', ''),
-                    file_link
+                    file_link,
+                    ext
                 )
                 
-                file_type = "PDF Document" if file_link.endswith('.pdf') else "XML Data"
-                print(f"🎯 New announcement - attempting {file_type} download...")
+                file_type = "PDF Document" if ext == '.pdf' else "XML Data"
+                print(f"🎯 New announcement - queued {file_type} download")
                 print(f"📝 Filename: {filename}")
+                print("-" * 80)
                 
-                self.smart_download_file(file_link, filename)
+                # Downloads for the whole batch run concurrently afterwards
+                return file_link, filename, ext
             else:
                 print(f"⚠️ Skipping unsupported file type: {file_link}")
         
         print("-" * 80)
+        return None
+    
+    def _download_one(self, file_url, filename, ext):
+        """Worker entry point - one file over the shared session"""
+        return self.smart_download_file(file_url, filename, ext)
+    
+    def refresh_downloaded(self):
+        """Snapshot the downloads directory with one listdir instead of a stat per file"""
+        try:
+            self._downloaded = set(os.listdir("nse_downloads"))
+        except FileNotFoundError:
+            self._downloaded = set()
+    
+    def download_files(self, downloads):
+        """Download (url, filename, ext) tuples concurrently over the pooled session"""
+        if not downloads:
+            return
+        
+        print(f"\n📥 Downloading {len(downloads)} files ({self.max_download_workers} at a time)...")
+        successful = 0
+        with ThreadPoolExecutor(max_workers=self.max_download_workers) as executor:
+            futures = {
+                executor.submit(self._download_one, file_url, filename, ext): filename
+                for file_url, filename, ext in downloads
+            }
+            for future in as_completed(futures):
+                try:
+                    if future.result():
+                        successful += 1
+                except Exception as e:
+                    print(f"❌ Download error for {futures[future]}: {e}")
+        
+        print(f"📊 Downloads: {successful}/{len(downloads)} successful")
     
     def check_announcements(self):
         """Check for new announcements"""
         print(f"\\n🔍 Checking NSE announcements at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Fetch RSS with curl
-        rss_content = self.fetch_rss_with_curl()
-        if not rss_content:
+        # Each poll starts by trying requests again
+        with self._method_lock:
+            self._last_method_success = 'requests'
+        
+        # Fetch and parse only the latest items (pooled session, curl fallback)
+        validators = (self.etag, self.last_modified)
+        latest_items = self.fetch_items(max_items=self.max_items)
+        if latest_items is NOT_MODIFIED:
+            print("📭 304 Not Modified - no new announcements")
+            return
+        if latest_items is None:
             print("❌ Could not fetch RSS content")
             return
-        
-        # Parse RSS
-        items = self.parse_rss_manually(rss_content)
-        if not items:
+        if not latest_items:
             print("❌ Could not parse any items from RSS")
             return
         
-        print(f"📈 Total items in RSS: {len(items)}")
-        print(f"🎯 Processing latest {min(self.max_items, len(items))} items")
+        print(f"🎯 Processing latest {len(latest_items)} items")
         
-        # Process latest items only
-        latest_items = items[:self.max_items]
         new_count = 0
+        downloads = []
+        if self.download_pdfs:
+            self.refresh_downloaded()
         
         for item in latest_items:
-            # Create unique ID
-            item_id = f"{item.get('title', '')}-{item.get('pubDate', '')}"
-            
-            if item_id not in self.seen_items:
-                self.seen_items.add(item_id)
+            if self.mark_new_item(item):
                 new_count += 1
-                self.process_announcement(item, is_new=True)
+                download = self.process_announcement(item, is_new=True)
+                if download:
+                    downloads.append(download)
             # Uncomment below to show all items
             # else:
             #     self.process_announcement(item, is_new=False)
         
+        self.download_files(downloads)
+        self.flush_logs()
+        
         print(f"\\n📊 SUMMARY: {new_count} new announcements, {len(latest_items) - new_count} previously seen")
         
         if new_count > 0:
             print(f"🔔 {new_count} NEW CORPORATE ANNOUNCEMENTS!")
-            self.save_cache()
         else:
             print("😴 No new announcements")
+        
+        # Persist new validators even when nothing new arrived, so the next run can get a 304
+        if new_count > 0 or (self.etag, self.last_modified) != validators:
+            self.save_cache()
     
     def get_download_stats(self):
         """Show download statistics for both PDF and XML files"""
@@ -416,34 +690,34 @@ class CompleteNSEMonitor:
             print("📊 No downloads directory found")
             return
         
-        # Get both PDF and XML files
-        pdf_files = [f for f in os.listdir(downloads_dir) if f.endswith('.pdf')]
-        xml_files = [f for f in os.listdir(downloads_dir) if f.endswith('.xml')]
-        all_files = pdf_files + xml_files
+        # One directory scan; DirEntry caches its stat() so each file is stat'd at most once
+        with os.scandir(downloads_dir) as it:
+            entries = [e for e in it if e.is_file() and e.name.endswith(SUPPORTED_EXTENSIONS)]
+        pdf_count = sum(1 for e in entries if e.name.endswith('.pdf'))
+        xml_count = len(entries) - pdf_count
         
-        if not all_files:
+        if not entries:
             print("📊 No files downloaded yet")
             return
         
-        total_size = sum(os.path.getsize(os.path.join(downloads_dir, f)) for f in all_files)
+        total_size = sum(e.stat().st_size for e in entries)
         
         print(f"\\n📊 DOWNLOAD STATISTICS:")
-        print(f"📄 PDF files: {len(pdf_files)}")
-        print(f"📋 XML files: {len(xml_files)}")
-        print(f"📁 Total files: {len(all_files)}")
+        print(f"📄 PDF files: {pdf_count}")
+        print(f"📋 XML files: {xml_count}")
+        print(f"📁 Total files: {len(entries)}")
         print(f"💾 Total size: {total_size / (1024*1024):.1f} MB")
         print(f"📂 Location: ./{downloads_dir}/")
         
         # Show recent downloads
-        if all_files:
-            recent_files = sorted(all_files, key=lambda x: os.path.getmtime(os.path.join(downloads_dir, x)), reverse=True)[:5]
-            print(f"\\n📋 Recent downloads:")
-            for f in recent_files:
-                file_path = os.path.join(downloads_dir, f)
-                size_kb = os.path.getsize(file_path) / 1024
-                mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                file_type = "📄 PDF" if f.endswith('.pdf') else "📋 XML"
-                print(f"   • {file_type}: {f} ({size_kb:.0f} KB) - {mtime.strftime('%Y-%m-%d %H:%M')}")
+        recent_files = sorted(entries, key=lambda e: e.stat().st_mtime, reverse=True)[:5]
+        print(f"\\n📋 Recent downloads:")
+        for entry in recent_files:
+            st = entry.stat()
+            size_kb = st.st_size / 1024
+            mtime = datetime.fromtimestamp(st.st_mtime)
+            file_type = "📄 PDF" if entry.name.endswith('.pdf') else "📋 XML"
+            print(f"   • {file_type}: {entry.name} ({size_kb:.0f} KB) - {mtime.strftime('%Y-%m-%d %H:%M')}")
     
     def test_filename_generation(self):
         """Test filename generation with sample data"""
@@ -470,13 +744,11 @@ class CompleteNSEMonitor:
         """Search for specific company announcements"""
         print(f"🔍 Searching for '{company_name}' announcements...")
         
-        # Fetch and parse RSS
-        rss_content = self.fetch_rss_with_curl()
-        if not rss_content:
+        # Fetch and parse RSS - searching needs the body even if it hasn't changed
+        items = self.fetch_items(conditional=False)
+        if items is None:
             print("❌ Could not fetch RSS")
             return
-        
-        items = self.parse_rss_manually(rss_content)
         if not items:
             print("❌ Could not parse RSS")
             return
@@ -489,8 +761,10 @@ class CompleteNSEMonitor:
         
         if matching_items:
             print(f"🏢 Found {len(matching_items)} announcements for '{company_name}':")
-            for item in matching_items:
-                self.process_announcement(item, is_new=True)
+            downloads = [self.process_announcement(item, is_new=True) for item in matching_items]
+            self.refresh_downloaded()
+            self.download_files([download for download in downloads if download])
+            self.flush_logs()
         else:
             print(f"❌ No announcements found for '{company_name}'")
     
@@ -519,20 +793,34 @@ class CompleteNSEMonitor:
         if self.download_pdfs:
             self.get_download_stats()
         
-        while True:
-            try:
-                self.check_announcements()
-                print(f"💤 Sleeping for {self.check_interval} seconds...")
-                time.sleep(self.check_interval)
-            except KeyboardInterrupt:
-                print("\\n👋 Monitor stopped")
-                if self.download_pdfs:
-                    self.get_download_stats()
-                break
-            except Exception as e:
-                print(f"❌ Error: {e}")
-                print("🔄 Retrying in 60 seconds...")
-                time.sleep(60)
+        stop = threading.Event()
+        try:
+            while not stop.is_set():
+                # Interval runs from the start of each check, so slow checks don't stretch the cadence
+                next_run = time.monotonic() + self.check_interval
+                try:
+                    self.check_announcements()
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+                    print("🔄 Retrying in 60 seconds...")
+                    next_run = time.monotonic() + 60
+                
+                delay = max(0, next_run - time.monotonic())
+                print(f"💤 Sleeping for {delay:.0f} seconds...")
+                # Only while sleeping does Ctrl+C just set the event, ending the wait immediately;
+                # during a check it still raises KeyboardInterrupt and aborts the check
+                previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+                try:
+                    stop.wait(timeout=delay)
+                finally:
+                    signal.signal(signal.SIGINT, previous_handler)
+        except KeyboardInterrupt:
+            pass
+        
+        print("\\n👋 Monitor stopped")
+        self.close_logs()
+        if self.download_pdfs:
+            self.get_download_stats()
 
 def main():
     print("🚀 Complete NSE Announcement Monitor - FIXED VERSION")
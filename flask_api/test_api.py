@@ -1,7 +1,9 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # API base URL
 BASE_URL = "http://localhost:8888"
@@ -10,24 +12,29 @@ BASE_URL = "http://localhost:8888"
 TEST_USERNAME = "testuser"
 TEST_PASSWORD = "testpassword"
 
+# One keep-alive session for every request instead of a new connection per call
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+
 def print_response(response):
     """Print the response details in a formatted way."""
-    print(f"Status Code: {response.status_code}")
-    print("Headers:")
+    # Built up and printed in one call so tests running in parallel don't interleave lines
+    lines = [f"Status Code: {response.status_code}", "Headers:"]
     for key, value in response.headers.items():
-        print(f"  {key}: {value}")
-    print("Response Body:")
+        lines.append(f"  {key}: {value}")
+    lines.append("Response Body:")
     try:
-        print(json.dumps(response.json(), indent=2))
+        lines.append(json.dumps(response.json(), indent=2))
     except:
-        print(response.text)
-    print("-" * 50)
+        lines.append(response.text)
+    lines.append("-" * 50)
+    print("\n".join(lines))
 
 def test_health_endpoint():
     """Test the health check endpoint."""
     print("\n🔍 Testing Health Check Endpoint...")
     try:
-        response = requests.get(f"{BASE_URL}/api/health")
+        response = SESSION.get(f"{BASE_URL}/api/health")
         print_response(response)
         
         if response.status_code == 200 and response.json().get("status") == "healthy":
@@ -49,7 +56,7 @@ def test_register_endpoint():
             "username": TEST_USERNAME,
             "password": TEST_PASSWORD
         }
-        response = requests.post(f"{BASE_URL}/api/register", json=payload)
+        response = SESSION.post(f"{BASE_URL}/api/register", json=payload)
         print_response(response)
         
         # Check if registration was successful or user already exists
@@ -75,7 +82,7 @@ def test_login_endpoint():
             "username": TEST_USERNAME,
             "password": TEST_PASSWORD
         }
-        response = requests.post(f"{BASE_URL}/api/login", json=payload)
+        response = SESSION.post(f"{BASE_URL}/api/login", json=payload)
         print_response(response)
         
         if response.status_code == 200 and "user_id" in response.json():
@@ -97,7 +104,7 @@ def test_invalid_login():
             "username": TEST_USERNAME,
             "password": "wrongpassword"
         }
-        response = requests.post(f"{BASE_URL}/api/login", json=payload)
+        response = SESSION.post(f"{BASE_URL}/api/login", json=payload)
         print_response(response)
         
         if response.status_code == 401:
@@ -120,11 +127,14 @@ def run_all_tests():
     print("Waiting for server to be ready...")
     time.sleep(2)
     
-    # Run tests
-    health_result = test_health_endpoint()
+    # Run tests - register must precede login; the other two are independent
     register_result = test_register_endpoint()
     login_result = test_login_endpoint()
-    invalid_login_result = test_invalid_login()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        health_future = executor.submit(test_health_endpoint)
+        invalid_login_future = executor.submit(test_invalid_login)
+        health_result = health_future.result()
+        invalid_login_result = invalid_login_future.result()
     
     # Print summary
     print("\n" + "=" * 50)
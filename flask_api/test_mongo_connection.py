@@ -1,41 +1,49 @@
 from pymongo import MongoClient
 import sys
 import os
-from config import MONGO_HOST, MONGO_PORT, MONGO_USERNAME, MONGO_PASSWORD, MONGO_DB
+from contextlib import closing
+from config import get_settings
+
+settings = get_settings()
+MONGO_HOST = settings.mongo_host
+MONGO_PORT = settings.mongo_port
+MONGO_USERNAME = settings.mongo_username
+MONGO_PASSWORD = settings.mongo_password
+MONGO_DB = settings.mongo_db
 
 def test_connection():
     """Test the MongoDB connection using the configured settings."""
     print(f"Testing MongoDB connection to {MONGO_HOST}:{MONGO_PORT}...")
     
     try:
-        # Create a MongoDB client
+        # Create a MongoDB client; closing() tears its socket pool down on exit
         client = MongoClient(
             host=MONGO_HOST,
             port=MONGO_PORT,
             username=MONGO_USERNAME if MONGO_USERNAME else None,
             password=MONGO_PASSWORD if MONGO_PASSWORD else None,
-            serverSelectionTimeoutMS=5000  # 5 second timeout
+            serverSelectionTimeoutMS=5000,  # 5 second timeout
+            connectTimeoutMS=5000,
+            maxPoolSize=4
         )
         
-        # Force a connection to verify
-        client.server_info()
-        
-        # Try to access the database
-        db = client[MONGO_DB]
-        collections = db.list_collection_names()
-        
-        print("✅ Connection successful!")
-        print(f"Available collections in '{MONGO_DB}' database: {collections}")
-        
-        # Check if users collection exists, create it if not
-        if 'users' not in collections:
-            print("Creating 'users' collection...")
-            db.create_collection('users')
-            print("✅ 'users' collection created successfully.")
-        else:
-            print("✅ 'users' collection already exists.")
-            user_count = db.users.count_documents({})
-            print(f"Number of users in database: {user_count}")
+        with closing(client):
+            # The first real command connects; an unreachable server raises ServerSelectionTimeoutError here
+            db = client[MONGO_DB]
+            collections = db.list_collection_names()
+            
+            print("✅ Connection successful!")
+            print(f"Available collections in '{MONGO_DB}' database: {collections}")
+            
+            # Check if users collection exists, create it if not
+            if 'users' not in collections:
+                print("Creating 'users' collection...")
+                db.create_collection('users')
+                print("✅ 'users' collection created successfully.")
+            else:
+                print("✅ 'users' collection already exists.")
+                user_count = db.users.count_documents({})
+                print(f"Number of users in database: {user_count}")
         
         return True
     
@@ -1,113 +1,292 @@
 import os
 import time
+import logging
+import logging.handlers
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 import csv
+import sqlite3
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 
 DOWNLOADS_DIR = os.path.join(os.path.dirname(__file__), "nse_downloads")
-UPLOADED_LOG = os.path.join(os.path.dirname(__file__), "uploaded_files.csv")
+UPLOADED_DB = os.path.join(os.path.dirname(__file__), "uploaded_files.db")
+UPLOADED_LOG = os.path.join(os.path.dirname(__file__), "uploaded_files.csv")  # Legacy log, imported into UPLOADED_DB
 BASE_URL = "http://18.207.201.219:1234"  # Base URL for all API endpoints
 UPLOAD_URL = f"{BASE_URL}/upload"
 STATUS_URL = f"{BASE_URL}/status"  # Will append /{doc_id}
+BATCH_STATUS_URL = f"{BASE_URL}/status/batch"  # POST {"doc_ids": [...]}
 QUERY_URL = f"{BASE_URL}/query"  # Will use query parameters
 DELETE_URL = f"{BASE_URL}/delete"  # Will append /{doc_id}
-SLEEP_INTERVAL = 5  # seconds to wait between status checks
+# Per-document URL templates, filled with % doc_id on every poll/delete
+_STATUS_TMPL = STATUS_URL + "/%s"
+_DELETE_TMPL = DELETE_URL + "/%s"
+# Status polling backs off exponentially: 0.5s, 1s, 2s, ... capped at STATUS_MAX_DELAY
+STATUS_INITIAL_DELAY = 0.5
+STATUS_MAX_DELAY = 15
+PROCESSING_TIMEOUT = 300  # seconds to wait for processing before giving up
+# (connect, read) timeouts per endpoint, so a hung server can't stall a run
+UPLOAD_TIMEOUT = (5, 120)
+STATUS_TIMEOUT = (2, 5)
+QUERY_TIMEOUT = (5, 60)
+DELETE_TIMEOUT = (2, 10)
+MAX_WORKERS = int(os.environ.get("UPLOAD_MAX_WORKERS", "8"))  # files processed at once by batch_process
+# Per-file states in batch_process: uploaded files wait in PENDING_STATUS until the
+# server reports them processed, go READY while being queried and deleted, then DONE.
+PENDING_STATUS, READY, DONE, FAILED = "pending_status", "ready", "done", "failed"
+
+log = logging.getLogger(__name__)
+
+def _configure_logging():
+    """Send progress messages to stderr; LOG_LEVEL sets the verbosity"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    if not sys.stderr.isatty():
+        # Redirected output is written in blocks instead of a write per message
+        handler = logging.handlers.MemoryHandler(256, flushLevel=logging.ERROR, target=handler)
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), handlers=[handler])
+
+# One keep-alive session so upload, status polls, query and delete share a connection
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+SESSION.headers.update({"Connection": "keep-alive"})
+
+def close_session():
+    """Release the pooled connections"""
+    SESSION.close()
+
+_log_lock = threading.Lock()  # batch_process workers record uploads concurrently
+_db_conn = None
+_uploaded = None  # filename -> doc_id, loaded from the database once per run
+_pending_rows = []  # Logged uploads not yet written; flushed in one transaction
+LOG_FLUSH_ROWS = 32  # Bounds how many uploads a crash can forget
+
+def _get_db():
+    """Open the upload database on first use, importing the legacy CSV log"""
+    global _db_conn
+    if _db_conn is None:
+        conn = sqlite3.connect(UPLOADED_DB, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS uploaded(filename TEXT PRIMARY KEY, doc_id TEXT)")
+        if os.path.exists(UPLOADED_LOG):
+            with open(UPLOADED_LOG, "r", newline="") as f:
+                rows = [row for row in csv.reader(f) if len(row) == 2]
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO uploaded VALUES (?, ?)", rows)
+            os.replace(UPLOADED_LOG, UPLOADED_LOG + ".imported")
+            log.info("Imported %d entries from %s", len(rows), os.path.basename(UPLOADED_LOG))
+        _db_conn = conn
+    return _db_conn
 
 def get_uploaded_files():
-    uploaded = {}
-    if not os.path.exists(UPLOADED_LOG):
-        return uploaded
-    with open(UPLOADED_LOG, "r", newline="") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) == 2:
-                filename, doc_id = row
-                uploaded[filename] = doc_id
-    return uploaded
+    global _uploaded
+    with _log_lock:
+        if _uploaded is None:
+            _flush_pending_rows()
+            _uploaded = dict(_get_db().execute("SELECT filename, doc_id FROM uploaded"))
+        return dict(_uploaded)
 
 def log_uploaded_file(filename, doc_id):
-    with open(UPLOADED_LOG, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([filename, doc_id])
+    with _log_lock:
+        _pending_rows.append((filename, doc_id))
+        if _uploaded is not None:
+            _uploaded.setdefault(filename, doc_id)
+        if len(_pending_rows) >= LOG_FLUSH_ROWS:
+            _flush_pending_rows()
+
+def flush_uploaded_log():
+    """Write any logged uploads still held in memory"""
+    with _log_lock:
+        _flush_pending_rows()
+
+def _flush_pending_rows():
+    # Caller holds _log_lock; one transaction (and one sync) for the whole batch
+    if not _pending_rows:
+        return
+    with _get_db() as conn:
+        conn.executemany("INSERT OR IGNORE INTO uploaded VALUES (?, ?)", _pending_rows)
+    _pending_rows.clear()
 
 def upload_file(filepath):
     """Upload a file and return the document ID"""
     filename = os.path.basename(filepath)
-    print(f"Uploading {filename}...")
+    log.info("Uploading %s...", filename)
     
     with open(filepath, "rb") as f:
-        files = {"file": (filename, f)}
+        # The encoder streams the multipart body from disk instead of building it in memory
+        encoder = MultipartEncoder(fields={"file": (filename, f, "application/octet-stream")})
         # Add headers or authentication as needed
-        response = requests.post(UPLOAD_URL, files=files)
-    
-    if response.status_code == 200:
         try:
-            data = response.json()
-            doc_id = data.get("doc_id")
-            if doc_id:
-                print(f"Uploaded {filename} successfully. doc_id: {doc_id}")
-                return doc_id
-        except Exception as e:
-            print(f"Error parsing response for {filename}: {e}")
-    else:
-        print(f"Failed to upload {filename}. Status code: {response.status_code}")
+            response = SESSION.post(
+                UPLOAD_URL,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+                timeout=UPLOAD_TIMEOUT
+            )
+        except requests.exceptions.Timeout:
+            log.warning("Upload of %s timed out.", filename)
+            return None
+        except requests.exceptions.RequestException as e:
+            log.error("Error uploading %s: %s", filename, e)
+            return None
+    
+    data = _json_body(response, "upload " + filename)
+    if data is None:
+        return None
     
+    doc_id = data.get("doc_id")
+    if doc_id:
+        log.info("Uploaded %s successfully. doc_id: %s", filename, doc_id)
+        return doc_id
     return None
 
+def _json_body(response, action):
+    """Decoded JSON of a successful response, or None (logged) if it failed or isn't JSON"""
+    if not response.ok:
+        log.error("Failed to %s. Status code: %s", action, response.status_code)
+        return None
+    # Checked up front rather than catching the decode error
+    if "application/json" not in response.headers.get("Content-Type", ""):
+        log.error("Non-JSON response to %s: %s", action, response.text[:200])
+        return None
+    return orjson.loads(response.content)
+
 def check_status(doc_id):
     """Check the processing status of a document"""
-    print(f"Checking status for doc_id: {doc_id}...")
+    return _check_status(doc_id)[0]
+
+_status_etags = {}  # doc_id -> ETag of its last status response
+
+def _check_status(doc_id):
+    """Check the processing status of a document; returns (is_done, Retry-After seconds or None)"""
+    log.info("Checking status for doc_id: %s...", doc_id)
     
-    url = f"{STATUS_URL}/{doc_id}"
-    response = requests.get(url)
+    url = _STATUS_TMPL % doc_id
+    # A 304 means the status hasn't moved on since the last (unfinished) answer
+    etag = _status_etags.get(doc_id)
+    headers = {"If-None-Match": etag} if etag else None
+    try:
+        response = SESSION.get(url, headers=headers, timeout=STATUS_TIMEOUT)
+    except requests.exceptions.Timeout:
+        log.warning("Status check for %s timed out.", doc_id)
+        return False, None
+    except requests.exceptions.RequestException as e:
+        log.error("Error checking status for %s: %s", doc_id, e)
+        return False, None
+    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
     
-    if response.status_code == 200:
+    if response.status_code == 304:
+        log.info("Status: unchanged")
+        return False, retry_after
+    
+    data = _json_body(response, "check status")
+    if data is None:
+        return False, retry_after
+    
+    status = data.get("status")
+    log.info("Status: %s", status)
+    if response.headers.get("ETag"):
+        _status_etags[doc_id] = response.headers["ETag"]
+    return status == "success", retry_after
+
+_batch_status_supported = True  # Cleared once the server turns the batch endpoint down
+
+def check_status_batch(doc_ids):
+    """Check several documents in one request; returns {doc_id: is_done}.
+    
+    Falls back to one status request per document, in parallel, if the server
+    has no batch endpoint.
+    """
+    global _batch_status_supported
+    if _batch_status_supported:
+        log.info("Checking status for %d documents...", len(doc_ids))
         try:
-            data = response.json()
-            status = data.get("status")
-            print(f"Status: {status}")
-            return status == "success"
+            response = SESSION.post(
+                BATCH_STATUS_URL,
+                data=orjson.dumps({"doc_ids": doc_ids}),
+                headers={"Content-Type": "application/json"},
+                timeout=STATUS_TIMEOUT
+            )
+            if response.status_code == 200:
+                statuses = orjson.loads(response.content)["statuses"]
+                return {doc_id: statuses.get(doc_id) in (True, "success") for doc_id in doc_ids}
+            if response.status_code in (404, 405, 501):
+                log.info("Batch status endpoint not available; checking documents one by one.")
+                _batch_status_supported = False
+            else:
+                log.error("Failed to check batch status. Status code: %s", response.status_code)
+        except requests.exceptions.Timeout:
+            # A slow server won't get faster with one request per document - wait for the next poll
+            log.warning("Batch status check timed out.")
+            return dict.fromkeys(doc_ids, False)
         except Exception as e:
-            print(f"Error parsing status response: {e}")
-    else:
-        print(f"Failed to check status. Status code: {response.status_code}")
+            log.error("Error checking batch status: %s", e)
     
-    return False
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        return dict(zip(doc_ids, executor.map(_check_status_or_false, doc_ids)))
+
+def _check_status_or_false(doc_id):
+    """check_status for the per-document fallback - one bad response only delays that document"""
+    try:
+        return check_status(doc_id)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        log.error("Error checking status for %s: %s", doc_id, e)
+        return False
+
+def _parse_retry_after(value):
+    """Retry-After in seconds; the HTTP-date form is ignored"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
 
 def query_document(doc_id, query_text):
     """Query the document with the given text"""
-    print(f"Querying document {doc_id} with: '{query_text}'")
+    log.info("Querying document %s with: '%s'", doc_id, query_text)
     
     params = {
         "query": query_text,
         "doc_id": doc_id
     }
     
-    response = requests.get(QUERY_URL, params=params)
+    try:
+        response = SESSION.get(QUERY_URL, params=params, timeout=QUERY_TIMEOUT)
+    except requests.exceptions.Timeout:
+        log.warning("Query of document %s timed out.", doc_id)
+        return None
+    except requests.exceptions.RequestException as e:
+        log.error("Error querying document %s: %s", doc_id, e)
+        return None
     
-    if response.status_code == 200:
-        try:
-            data = response.json()
-            return data
-        except Exception as e:
-            print(f"Error parsing query response: {e}")
-    else:
-        print(f"Failed to query document. Status code: {response.status_code}")
-    
-    return None
+    return _json_body(response, "query document")
 
 def delete_document(doc_id):
     """Delete the document from the server"""
-    print(f"Deleting document {doc_id}...")
+    log.info("Deleting document %s...", doc_id)
     
-    url = f"{DELETE_URL}/{doc_id}"
-    response = requests.delete(url)
+    url = _DELETE_TMPL % doc_id
+    try:
+        response = SESSION.delete(url, timeout=DELETE_TIMEOUT)
+    except requests.exceptions.Timeout:
+        log.warning("Deleting document %s timed out.", doc_id)
+        return False
+    except requests.exceptions.RequestException as e:
+        log.error("Error deleting document %s: %s", doc_id, e)
+        return False
     
     if response.status_code == 200:
-        print(f"Document {doc_id} deleted successfully.")
+        _status_etags.pop(doc_id, None)
+        log.info("Document %s deleted successfully.", doc_id)
         return True
     else:
-        print(f"Failed to delete document. Status code: {response.status_code}")
+        log.error("Failed to delete document. Status code: %s", response.status_code)
         return False
 
 def process_document(filepath, query_text=None):
@@ -115,25 +294,30 @@ def process_document(filepath, query_text=None):
     # Step 1: Upload the document
     doc_id = upload_file(filepath)
     if not doc_id:
-        print("Upload failed. Aborting process.")
+        log.error("Upload failed. Aborting process.")
         return False
     
-    # Step 2: Check status until success or timeout
-    max_attempts = 12  # 1 minute with 5-second intervals
-    attempt = 0
-    success = False
+    # Step 2: Check status until success or timeout, backing off between checks
+    delay = STATUS_INITIAL_DELAY
+    deadline = time.monotonic() + PROCESSING_TIMEOUT
     
-    while attempt < max_attempts:
-        success = check_status(doc_id)
+    while True:
+        success, retry_after = _check_status(doc_id)
         if success:
             break
         
-        print(f"Processing not complete. Waiting {SLEEP_INTERVAL} seconds...")
-        time.sleep(SLEEP_INTERVAL)
-        attempt += 1
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        
+        # The server's Retry-After wins over our own schedule
+        wait = min(retry_after if retry_after is not None else delay, remaining)
+        log.info("Processing not complete. Waiting %.1f seconds...", wait)
+        time.sleep(wait)
+        delay = min(delay * 2, STATUS_MAX_DELAY)
     
     if not success:
-        print("Document processing timed out or failed.")
+        log.error("Document processing timed out or failed.")
         return False
     
     # Step 3: Query the document if query text is provided
@@ -143,7 +327,7 @@ def process_document(filepath, query_text=None):
             print("\nQuery Result:")
             print(result)
         else:
-            print("Query failed.")
+            log.error("Query failed.")
     
     # Step 4: Delete the document
     delete_document(doc_id)
@@ -151,6 +335,7 @@ def process_document(filepath, query_text=None):
     return True
 
 def main():
+    _configure_logging()
     if len(sys.argv) < 2:
         print("Usage: python upload_to_ai.py <filepath> [query_text]")
         return
@@ -162,39 +347,141 @@ def main():
         print(f"File not found: {filepath}")
         return
     
-    process_document(filepath, query_text)
+    try:
+        process_document(filepath, query_text)
+    finally:
+        close_session()
+
+def upload_one(filename, filepath):
+    """Upload and log one file from the downloads directory; returns (filename, doc_id)"""
+    doc_id = upload_file(filepath)
+    if not doc_id:
+        log.error("Failed to upload %s or missing doc_id.", filename)
+        return filename, None
+    
+    log_uploaded_file(filename, doc_id)
+    return filename, doc_id
+
+def finish_one(filename, doc_id, delete_executor=None):
+    """Query and delete a processed document; the delete runs on delete_executor if given"""
+    # Use a default query
+    result = query_document(doc_id, "Summarize this document")
+    if result:
+        # One write, so results from parallel workers don't interleave
+        print(f"Query result for {filename}:\n{result}")
+    
+    # Delete the document
+    if delete_executor is None:
+        delete_document(doc_id)
+    else:
+        # Nothing waits on the delete, so this worker is free for the next upload
+        future = delete_executor.submit(delete_document, doc_id)
+        future.add_done_callback(lambda f: _log_delete_error(f, doc_id))
+
+def _log_delete_error(future, doc_id):
+    # delete_document logs its own failed responses; this catches what it raised
+    if future.exception() is not None:
+        log.error("Error deleting document %s: %s", doc_id, future.exception())
 
 def batch_process():
     """Process all new files in the downloads directory"""
-    print("Starting batch processing...")
+    _configure_logging()
+    log.info("Starting batch processing...")
     uploaded_files = get_uploaded_files()
-    all_files = [
-        f for f in os.listdir(DOWNLOADS_DIR)
-        if os.path.isfile(os.path.join(DOWNLOADS_DIR, f))
-    ]
-    new_files = [f for f in all_files if f not in uploaded_files]
-
-    for filename in new_files:
-        filepath = os.path.join(DOWNLOADS_DIR, filename)
+    # One directory read; DirEntry.is_file() is answered from it without a stat per file
+    with os.scandir(DOWNLOADS_DIR) as it:
+        all_files = {e.name: e.path for e in it if e.is_file()}
+    # Set difference runs in C; sorting keeps the upload order stable between runs
+    new_files = [(name, all_files[name]) for name in sorted(all_files.keys() - uploaded_files.keys())]
+
+    try:
+        # Each file is mostly waiting on the server, so several run side by side
+        # Deletes get their own small pool; leaving the with block waits for them
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+                ThreadPoolExecutor(max_workers=2) as delete_executor:
+            states = _run_pipeline(executor, delete_executor, new_files)
+    finally:
+        flush_uploaded_log()
+        close_session()
+    
+    done = sum(1 for state in states.values() if state == DONE)
+    log.info("Batch processing finished: %d done, %d failed.", done, len(states) - done)
+
+def _run_pipeline(executor, delete_executor, new_files):
+    """Overlap uploads, status polls and query/delete - each document moves on as soon as it can.
+    
+    Returns {filename: final state}.
+    """
+    states = {}
+    uploads = {executor.submit(upload_one, name, path): name for name, path in new_files}
+    finishing = {}  # future -> filename
+    pending = {}  # doc_id -> (filename, status deadline)
+    delay = STATUS_INITIAL_DELAY
+    next_poll = None
+    
+    while uploads or pending:
+        # Sleep until the next poll is due, waking early to pick up finished uploads
+        timeout = max(0.0, next_poll - time.monotonic()) if pending else None
+        if uploads:
+            done, _ = wait(uploads, timeout=timeout, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(timeout)
+            done = ()
+        
+        for future in done:
+            name = uploads.pop(future)
+            try:
+                filename, doc_id = future.result()
+            except Exception as e:
+                log.error("Error processing %s: %s", name, e)
+                states[name] = FAILED
+                continue
+            if not doc_id:
+                states[filename] = FAILED
+                continue
+            
+            states[filename] = PENDING_STATUS
+            # Interned, so the per-poll lookups in pending and the status maps compare by identity
+            if isinstance(doc_id, str):
+                doc_id = sys.intern(doc_id)
+            # Fresh documents get the short first delay
+            delay = STATUS_INITIAL_DELAY
+            first_check = time.monotonic() + delay
+            next_poll = first_check if not pending else min(next_poll, first_check)
+            pending[doc_id] = (filename, time.monotonic() + PROCESSING_TIMEOUT)
+        
+        if not pending or time.monotonic() < next_poll:
+            continue
+        
+        # One status request per poll covers every document still pending
+        statuses = check_status_batch(sorted(pending))
+        now = time.monotonic()
+        for doc_id in list(pending):
+            filename, deadline = pending[doc_id]
+            if statuses.get(doc_id):
+                del pending[doc_id]
+                states[filename] = READY
+                finishing[executor.submit(finish_one, filename, doc_id, delete_executor)] = filename
+            elif now >= deadline:
+                del pending[doc_id]
+                states[filename] = FAILED
+                log.error("Document processing timed out or failed for %s.", filename)
+        
+        if pending:
+            log.info("%d documents still processing. Waiting %.1f seconds...", len(pending), delay)
+        next_poll = now + delay
+        delay = min(delay * 2, STATUS_MAX_DELAY)
+    
+    for future in as_completed(finishing):
+        filename = finishing[future]
         try:
-            doc_id = upload_file(filepath)
-            if doc_id:
-                log_uploaded_file(filename, doc_id)
-                
-                # Process the document
-                if check_status(doc_id):
-                    # Use a default query
-                    result = query_document(doc_id, "Summarize this document")
-                    if result:
-                        print(f"Query result for {filename}:")
-                        print(result)
-                    
-                    # Delete the document
-                    delete_document(doc_id)
-            else:
-                print(f"Failed to upload {filename} or missing doc_id.")
+            future.result()
+            states[filename] = DONE
         except Exception as e:
-            print(f"Error processing {filename}: {e}")
+            log.error("Error processing %s: %s", filename, e)
+            states[filename] = FAILED
+    
+    return states
 
 if __name__ == "__main__":
     main()